@@ -1,4 +1,5 @@
-import concurrent.futures
+import threading
+from collections.abc import Callable
 from time import sleep
 import re
 import json
@@ -26,45 +27,61 @@ dir_path_current: str = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(dir_path_current + "/model/services")
 # </Generic Model>
 
-# <Models>
-if config.CLASSIFIER_CATEGORIZER_USE:
-    from model.categorizer.app import Categorizer
+# <Retrieve keywords>
+def load_labels() -> tuple[dict[str, dict[str, list[str]]],
+                           dict[str, dict[str, float | str]]]:
+    """
+    :return: the labels (`data/labels.json`) and the precisions of the
+        chosen model (`data/xxx_parameters.json`).
+    """
 
-if config.CLASSIFIER_TFIDF_USE:
-    from model.tfidf.app import Tfidf
-# </Models>
+    from functions import load_json
 
-# <Retrieve keywords>
-from functions import load_json
+    labels: dict[str, dict[str, list[str]]] =\
+        load_json('data/labels.json')
+    precisions: dict[str, dict[str, float | str]] = {}
 
-labels: dict[str, dict[str, list[str]]] =\
-    load_json('data/labels.json')
+    if config.CLASSIFIER_CATEGORIZER_USE:
+        precisions = load_json('data/sentence_transformers_parameters.json')
 
-if config.CLASSIFIER_CATEGORIZER_USE:
-    precisions: dict[str, dict[str, float | str]] =\
-        load_json('data/sentence_transformers_parameters.json')
+    if config.CLASSIFIER_TFIDF_USE:
+        precisions = load_json('data/tfidf_parameters.json')
 
-if config.CLASSIFIER_TFIDF_USE:
-    precisions: dict[str, dict[str, str]] =\
-        load_json('data/tfidf_parameters.json')
+    return labels, precisions
 # </Retrieve keywords>
 
 class Classifier:
     def __init__(self):
+        """
+        Nothing is loaded when this module is imported, the labels and the
+            models are loaded here, see `ModelLifecycle` in `lifecycle.py`.
+        """
+
         print("Classifier initializing...")
 
+        labels, precisions = load_labels()
+
         # <Models>
         if config.CLASSIFIER_CATEGORIZER_USE:
+            from model.categorizer.app import Categorizer
+
             self._model_categorizer =\
                 Categorizer(labels=labels, precisions=precisions)
 
         if config.CLASSIFIER_TFIDF_USE:
+            from model.tfidf.app import Tfidf
+
             self._model_tfidf =\
                 Tfidf(labels=labels, precisions=precisions)
         # </Models>
 
         self._extra_class: str = "Other"
 
+        # <Background retraining>, see `self.retrain_tfidf()`.
+        self._retraining: bool = False
+        self._retraining_lock = threading.Lock()
+        # </Background retraining>
+
         # <Error Payload>
         self._error_payload: dict[str, list[str]] = {
             key: "[]" for key in labels
@@ -73,13 +90,51 @@ class Classifier:
 
         print("Classifier initialized.")
 
+    #########################################################################
+    #### Warm-up
+    #########################################################################
+
+    def warm_up(self) -> None:
+        """
+        Run a synthetic prompt, alone and in a batch, through every loaded
+            model, so the first real prompt does not pay for the lazy
+            initializations (the first forward pass, the NLTK corpora...).
+
+        It raises an Exception if a model returns an error.
+        """
+
+        prompt: str = "Warm-up, a synthetic publication about transport,\
+ mobility and logistics."
+
+        models: list = []
+        if config.CLASSIFIER_CATEGORIZER_USE:
+            models.append(self._model_categorizer)
+        if config.CLASSIFIER_TFIDF_USE:
+            models.append(self._model_tfidf)
+
+        for model in models:
+            batch_results: list[dict[str, str]] | dict[str, str] =\
+                model.prompt_batch([ prompt ] * 2)
+
+            # A single error payload if the whole batch failed.
+            results: list[dict[str, str]] = [ model.prompt(prompt) ]\
+                + (batch_results if isinstance(batch_results, list)\
+                   else [ batch_results ])
+
+            for result in results:
+                if 'error' in result:
+                    raise Exception(f'{model.name} warm-up failed:\
+ {result["error"]}')
+
     #########################################################################
     #### Generic Prompt
     #########################################################################
 
-    def _threaded_prompt_generic(self, prompt: str) -> dict[str, str]:
+    def _threaded_prompt_generic(self, prompt: str,
+                                 doi: str = "") -> dict[str, str]:
         """
         :param prompt: a text, see `self.prompt_generic()`.
+        :param doi: see `self.prompt_generic()`.
         :return: What `self.model_xxxx.prompt(prompt)` returns.
 
         Here is the order of which model is taken:
@@ -94,10 +149,16 @@ class Classifier:
         """
 
         if config.CLASSIFIER_TFIDF_USE:
-            return self._model_tfidf.prompt(prompt)
-        return self._model_categorizer.prompt(prompt)
+            # Read once, the model could be swapped in the meantime.
+            model_tfidf = self._model_tfidf
 
-    def prompt_generic(self, prompt: str) -> dict[str, str]:
+            result: dict[str, str] = model_tfidf.prompt(prompt)
+            result['model_version'] = model_tfidf.version()
+            return result
+
+        return self._model_categorizer.prompt(prompt, doi=doi)
+
+    def prompt_generic(self, prompt: str, doi: str = "") -> dict[str, str]:
         """
         :param prompt: it is a text.
         This is better if it is already parsed, as for instance:
@@ -114,6 +175,10 @@ class Classifier:
         Mathematical analysis,
         ```
 
+        :param doi: the DOI of the publication, if any. The *Categorizer*
+            keeps the embedding of a publication by DOI and text, see
+            `CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE`.
+
         :return: The results of the chosen model
             (see `self._threaded_prompt_generic`).
 
@@ -137,12 +202,147 @@ class Classifier:
         If there is an error, it returns `self.error_payload()`.
         """
 
-        result: dict[str, str] = self._threaded_prompt_generic(prompt)
+        result: dict[str, str] = self._threaded_prompt_generic(prompt, doi)
 
         if 'error' in result:
             return self.error_payload()
         return result
 
+    #########################################################################
+    #### Batch Prompt
+    #########################################################################
+
+    def _threaded_prompt_batch(self, prompts: list[str],
+                               dois: list[str] | None = None)\
+                                    -> list[dict[str, str]] | dict[str, str]:
+        """
+        :param prompts: some texts, see `self.prompt_batch()`.
+        :param dois: see `self.prompt_batch()`.
+        :return: What `self.model_xxxx.prompt_batch(prompts)` returns.
+
+        The model is chosen as in `self._threaded_prompt_generic()`.
+        """
+
+        if config.CLASSIFIER_TFIDF_USE:
+            # Read once, the model could be swapped in the meantime.
+            model_tfidf = self._model_tfidf
+
+            results: list[dict[str, str]] | dict[str, str] =\
+                model_tfidf.prompt_batch(prompts)
+
+            if isinstance(results, dict):
+                return results
+
+            for result in results:
+                result['model_version'] = model_tfidf.version()
+            return results
+
+        return self._model_categorizer.prompt_batch(
+            prompts, batch_size=config.CLASSIFIER_CATEGORIZER_BATCH_SIZE,
+            dois=dois
+        )
+
+    def prompt_batch(self, prompts: list[str],
+                     dois: list[str] | None = None) -> list[dict[str, str]]:
+        """
+        :param prompts: some texts, see `self.prompt_generic()`.
+        :param dois: the DOI of each prompt, if any, see
+            `self.prompt_generic()`.
+        :return: The results of the chosen model, one per prompt and
+            in the same order (see `self.prompt_generic()`).
+
+        It is the same as calling `self.prompt_generic()` on each prompt,
+            but the model classifies the whole batch at once.
+
+        If there is an error, the result of the concerned prompts
+            is `self.error_payload()`.
+        """
+
+        if len(prompts) == 0:
+            return []
+
+        results: list[dict[str, str]] | dict[str, str] =\
+            self._threaded_prompt_batch(prompts, dois)
+
+        # <The whole batch failed>
+        if isinstance(results, dict):
+            return [ self.error_payload() for _ in prompts ]
+        # </The whole batch failed>
+
+        return [ self.error_payload() if 'error' in result else result\
+                for result in results ]
+
+    def prompt_publications(self, publications: list[dict[str, str | list]])\
+                                    -> dict[str, dict[str, dict[str, str]]]:
+        """
+        :param publications: some publications in the *Crossref style*, as
+            `json.loads()` of the data given to `self.parsing_by_publication()`.
+        :return: the results keyed by DOI (or by `#<index>` if there is no
+            DOI), and the errors of the publications that could not be
+            classified, keyed the same way:
+
+        ```python
+        {
+            'results': { '10.1016/j.marpol.2022.105310': { 'challenges': ...,
+                                                           'DOI': ... } },
+            'errors': { '#3': { 'message': "..." } }
+        }
+        ```
+
+        The publications are parsed first, then classified at once by
+            `self.prompt_batch()`, a publication that fails does not fail the
+            others.
+        """
+
+        results: dict[str, dict[str, str]] = {}
+        errors: dict[str, dict[str, str]] = {}
+
+        # <Parsing>
+        keys: list[str] = []
+        dois: list[str] = []
+        texts: list[str] = []
+
+        for i, publication in enumerate(publications):
+            doi: str = str(publication.get('DOI', ""))\
+                if isinstance(publication, dict) else ""
+            key: str = doi if doi != "" else f'#{i}'
+
+            try:
+                if not isinstance(publication, dict):
+                    raise Exception("A publication must be a JSON object.")
+
+                texts.append(
+                    JsonParserCrossref(json.dumps(publication)).classify_me()
+                )
+                keys.append(key)
+                dois.append(doi)
+
+            except Exception as e:
+                errors[key] = { 'message': f'Parsing failed: {e}' }
+        # </Parsing>
+
+        if len(texts) == 0:
+            return { 'results': results, 'errors': errors }
+
+        # <Classification>
+        batch_results: list[dict[str, str]] | dict[str, str] =\
+            self._threaded_prompt_batch(texts, dois)
+
+        # A single error payload if the whole batch failed.
+        if isinstance(batch_results, dict):
+            batch_results = [ batch_results ] * len(texts)
+
+        for key, doi, result in zip(keys, dois, batch_results):
+            if 'error' in result:
+                errors[key] = { 'message': str(result['error']) }
+                continue
+
+            results[key] = self.add_extra_class(result)
+            results[key]['DOI'] = doi
+        # </Classification>
+
+        return { 'results': results, 'errors': errors }
+
     #########################################################################
     #### Model - Categorizer
     #########################################################################
@@ -170,9 +370,74 @@ class Classifier:
 
     def train_tfidf(self, input_file: str = "") -> None:
         """
-        See `model/tfidf/app.py`.
+        See `Tfidf.retrained()` in `model/tfidf/app.py`.
+
+        The serving model is replaced by the retrained one once it is
+            validated, it is never trained in place.
         """
-        self._model_tfidf.train(input_file=input_file)
+        self._model_tfidf = self._model_tfidf.retrained(input_file=input_file)
+
+    def retrain_tfidf(self, input_file: str = "",
+                      spawn: Callable[..., object] | None = None) -> bool:
+        """
+        Same as `self.train_tfidf()`, but in the background: the prompts keep
+            being classified by the current model until the new one is
+            published with a single reference swap.
+
+        :param input_file: see `Tfidf.train()`.
+        :param spawn: runs a function in a thread, as in
+            `ModelLifecycle.start()`: under *gevent*, take
+            `gevent.get_hub().threadpool.spawn`, otherwise the new models are
+            compiled and validated in the event loop.
+        :return: False if a retraining (or an update) is already running.
+        """
+
+        with self._retraining_lock:
+            if self._retraining:
+                return False
+            self._retraining = True
+
+        if spawn is None:
+            threading.Thread(target=self._retrain_tfidf, args=(input_file,),
+                             daemon=True).start()
+        else:
+            spawn(self._retrain_tfidf, input_file)
+
+        return True
+
+    def _retrain_tfidf(self, input_file: str) -> None:
+        try:
+            self.train_tfidf(input_file=input_file)
+
+            print(f'TFIDF model retrained, version\
+ {self._model_tfidf.version()} published.')
+
+        except Exception as e:
+            # The current model keeps serving.
+            print(f'TFIDF retraining failed, the current model is kept.\n{e}')
+
+        finally:
+            self._retraining = False
+
+    def update_tfidf(self, records: dict[str, dict[str, str]]) -> None:
+        """
+        See `Tfidf.updated()` in `model/tfidf/app.py`.
+
+        It raises an Exception while a retraining is running, the retrained
+            model would replace the updated one, and no retraining starts
+            during the update.
+        """
+
+        with self._retraining_lock:
+            if self._retraining:
+                raise Exception('The TFIDF model is being retrained, update\
+ it once the retraining is done!')
+            self._retraining = True
+
+        try:
+            self._model_tfidf = self._model_tfidf.updated(records)
+        finally:
+            self._retraining = False
 
     #########################################################################
     #### Specific Payloads
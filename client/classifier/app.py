@@ -3,10 +3,16 @@ from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from time import time
 
+import hmac
 import json
 import re
 
+import gevent
+import gevent.threadpool
+
 from Classifier import Classifier
+from dispatcher import MicroBatcher
+from lifecycle import ModelLifecycle
 import config
 
 # <Use the multithreading to labellize a dataset>, development mode.
@@ -16,7 +22,57 @@ import config
 # </Use the multithreading to labellize a dataset>
 
 socketio = SocketIO(async_mode='gevent', path='/socket.io/')
-classifier = Classifier()
+
+# <Models>, loaded in the background (see `lifecycle.py`), the connections
+# are accepted meanwhile and the events wait for the models.
+lifecycle = ModelLifecycle(load=Classifier, warm_up=Classifier.warm_up)
+
+def get_classifier() -> Classifier:
+    """
+    :return: the classifier, once the models are ready.
+
+    It waits at most `CLASSIFIER_READY_TIMEOUT` seconds, then raises an
+        Exception, which is sent to the client by `handle_error()`.
+    """
+    return lifecycle.get(timeout=config.CLASSIFIER_READY_TIMEOUT,
+                         sleep=socketio.sleep)
+# </Models>
+
+# <Inference>, in `MAX_WORKERS` native threads, the models never yield, so in
+# a greenlet they would stall every socket (and its heartbeats) meanwhile.
+inference_pool = gevent.threadpool.ThreadPool(maxsize=config.MAX_WORKERS)
+# </Inference>
+
+# <Micro-batching>, the prompts of concurrent events are classified together,
+# see `dispatcher.py`.
+def prompt_batch(prompts: list[tuple[str, str]]) -> list[dict[str, str]]:
+    """
+    :param prompts: (prompt, DOI) of each event.
+    :return: see `Classifier.prompt_batch()`.
+    """
+    return lifecycle.get().prompt_batch([ prompt for prompt, _ in prompts ],
+                                        dois=[ doi for _, doi in prompts ])
+
+dispatcher = MicroBatcher(
+    process=prompt_batch,
+    max_batch_size=config.CLASSIFIER_DISPATCHER_BATCH_SIZE,
+    max_delay=config.CLASSIFIER_DISPATCHER_DELAY,
+    max_queue_size=config.CLASSIFIER_DISPATCHER_QUEUE_SIZE,
+    threadpool=inference_pool
+)
+# </Micro-batching>
+
+def safe_object_hook(obj):
+    # Only allow known keys to prevent hefty exploitations
+    allowed_keys: list[str] = [
+        "DOI", "ISSN", "OPENALEX", "TL;DR", "URL", "abstract",
+        "abstract_inverted_index", "author", "concepts", "container-title",
+        "container-url", "keywords", "publication_date", "publisher",
+        "reference", "related", "sustainable_development_goals",
+        "title", "topics", "type"
+    ]
+
+    return {key: obj[key] for key in obj if key in allowed_keys}
 
 def create_app() -> Flask:
     app = Flask(__name__)
@@ -24,6 +80,38 @@ def create_app() -> Flask:
     CORS(app, resources={r"/*": { "origins": "*" }})
     socketio.init_app(app, cors_allowed_origins=config.FLASK_ALLOWED_ORIGINS)
 
+    # <Readiness probe>, 200 once the models are ready, 503 before.
+    @app.route("/ready")
+    def ready():
+        return lifecycle.status(), 200 if lifecycle.ready() else 503
+    # </Readiness probe>
+
+    # <TFIDF retraining>, on `CLASSIFIER_TFIDF_INPUT_FILE`, in the background
+    # (see `Classifier.retrain_tfidf()`), with the header
+    # `Authorization: Bearer <FLASK_BACKEND_SECRETKEY>`.
+    @app.route("/tfidf/retrain", methods=["POST"])
+    def retrain_tfidf():
+        authorization: str = request.headers.get("Authorization", "")
+
+        if not config.FLASK_BACKEND_SECRETKEY or not hmac.compare_digest(
+                authorization.encode(),
+                f'Bearer {config.FLASK_BACKEND_SECRETKEY}'.encode()):
+            abort(403)
+
+        if not config.CLASSIFIER_TFIDF_USE or not lifecycle.ready():
+            return lifecycle.status(), 503
+
+        # A native thread, as the loading.
+        started: bool = lifecycle.get().retrain_tfidf(
+            spawn=gevent.get_hub().threadpool.spawn)
+
+        return { 'retraining': started }, 202 if started else 409
+    # </TFIDF retraining>
+
+    # A native thread, not a greenlet, so the event loop does not wait
+    # for the loading.
+    lifecycle.start(spawn=gevent.get_hub().threadpool.spawn)
+
     config.debug_wrapper(timestamp=time(), message="Classifier app created.")
     return app
 
@@ -48,7 +136,11 @@ def handle_error(e):
     error_json_dict: dict[str, dict] = { 'error': { 'message': error_str } }
 
     emit("classification_error", error_json_dict, to=request.sid)
-    emit("classification_results", classifier.error_payload(), to=request.sid)
+
+    # There is no payload before the models are loaded.
+    if lifecycle.ready():
+        emit("classification_results", lifecycle.get().error_payload(),
+             to=request.sid)
 
     config.debug_wrapper(event="error", timestamp=time(),\
                          clientid=request.sid,\
@@ -63,6 +155,8 @@ def handle_text_classify(data: str) -> None:
                              length=len(data), message="send 400")
         abort(400)  # Invalid input
 
+    classifier: Classifier = get_classifier()
+
     parsed_data: str = str(data)
     config.debug_wrapper(event="text_classification", timestamp=time(),\
                          clientid=request.sid, prompt=parsed_data)
@@ -70,14 +164,14 @@ def handle_text_classify(data: str) -> None:
     # <Get the prompt result>
     config.debug_wrapper(event="text_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="calling classifier.prompt_generic()")
+                         message="calling dispatcher.submit()")
 
     results: dict[str, list[str]] =\
-        classifier.add_extra_class(classifier.prompt_generic(parsed_data))
+        classifier.add_extra_class(dispatcher.submit((parsed_data, "")))
 
     config.debug_wrapper(event="text_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="classifier.prompt_generic() returned",\
+                         message="dispatcher.submit() returned",\
                          output={str(results)[:300]})
     # </Get the prompt result>
 
@@ -96,19 +190,9 @@ def handle_json_classify(data: str) -> None:
                              length=len(data), message="send 400")
         abort(400)  # Invalid input
 
-    # <Parse json data>
-    def safe_object_hook(obj):
-        # Only allow known keys to prevent hefty exploitations
-        allowed_keys: list[str] = [
-            "DOI", "ISSN", "OPENALEX", "TL;DR", "URL", "abstract",
-            "abstract_inverted_index", "author", "concepts", "container-title",
-            "container-url", "keywords", "publication_date", "publisher",
-            "reference", "related", "sustainable_development_goals",
-            "title", "topics", "type"
-        ]
-
-        return {key: obj[key] for key in obj if key in allowed_keys}
+    classifier: Classifier = get_classifier()
 
+    # <Parse json data>
     data_dict: dict[str, int | str] =\
         json.loads(data, object_hook=safe_object_hook)
 
@@ -123,16 +207,16 @@ def handle_json_classify(data: str) -> None:
     # <Get the prompt result>
     config.debug_wrapper(event="json_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="calling classifier.prompt_generic()")
+                         message="calling dispatcher.submit()")
 
     results: dict[str, list[str]] =\
-        classifier.add_extra_class(classifier.prompt_generic(parsed_data))
+        classifier.add_extra_class(dispatcher.submit((parsed_data, doi)))
 
     results['DOI'] = doi
 
     config.debug_wrapper(event="json_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="classifier.prompt_generic() returned",\
+                         message="dispatcher.submit() returned",\
                          output={str(results)[:300]})
     # </Get the prompt result>
 
@@ -151,19 +235,9 @@ def handle_dataset_classify(data: str) -> None:
                              length=len(data), message="send 400")
         abort(400)  # Invalid input
 
-    # <Parse json data>
-    def safe_object_hook(obj):
-        # Only allow known keys to prevent hefty exploitations
-        allowed_keys: list[str] = [
-            "DOI", "ISSN", "OPENALEX", "TL;DR", "URL", "abstract",
-            "abstract_inverted_index", "author", "concepts", "container-title",
-            "container-url", "keywords", "publication_date", "publisher",
-            "reference", "related", "sustainable_development_goals",
-            "title", "topics", "type"
-        ]
-
-        return {key: obj[key] for key in obj if key in allowed_keys}
+    classifier: Classifier = get_classifier()
 
+    # <Parse json data>
     data_dict: dict[str, int | str] =\
         json.loads(data, object_hook=safe_object_hook)
 
@@ -177,18 +251,18 @@ def handle_dataset_classify(data: str) -> None:
     # <Get the prompt result>
     config.debug_wrapper(event="dataset_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="calling classifier.prompt_generic()")
+                         message="calling dispatcher.submit()")
 
     results: dict[str, list[str]] =\
         classifier.add_extra_class(
-            classifier.prompt_generic(classifier.parsing_by_line(data))
+            dispatcher.submit((classifier.parsing_by_line(data), doi))
         )
 
     results['DOI'] = doi
 
     config.debug_wrapper(event="dataset_classification", timestamp=time(),\
                          clientid=request.sid,\
-                         message="classifier.prompt_generic() returned",\
+                         message="dispatcher.submit() returned",\
                          output={str(results)[:300]})
     # </Get the prompt result>
 
@@ -198,6 +272,65 @@ def handle_dataset_classify(data: str) -> None:
 
     emit("classification_results", results, to=request.sid)
 
+@socketio.on('batch_classification')
+def handle_batch_classify(data: str) -> None:
+    """
+    :param data: `json.dumps()` of a list of publications, each as the
+        data of `json_classification`, at most `FLASK_MAX_BATCH_SIZE`.
+
+    It emits a single `classification_results_batch`, see
+        `Classifier.prompt_publications()`.
+    """
+
+    if not isinstance(data, str) or len(data) >\
+            config.FLASK_MAX_INPUT_LENGTH * config.FLASK_MAX_BATCH_SIZE:
+        config.debug_wrapper(event="batch_classification", timestamp=time(),\
+                             typeof=type(data), clientid=request.sid,\
+                             length=len(data), message="send 400")
+        abort(400)  # Invalid input
+
+    classifier: Classifier = get_classifier()
+
+    # <Parse json data>
+    publications: list[dict[str, str | list]] = json.loads(data)
+
+    if not isinstance(publications, list) or\
+            len(publications) > config.FLASK_MAX_BATCH_SIZE:
+        config.debug_wrapper(event="batch_classification", timestamp=time(),\
+                             typeof=type(publications), clientid=request.sid,\
+                             message="send 400")
+        abort(400)  # Invalid input
+
+    # Only the known keys of each publication are kept.
+    publications = [ safe_object_hook(publication)\
+                     if isinstance(publication, dict) else publication\
+                     for publication in publications ]
+
+    config.debug_wrapper(event="batch_classification", timestamp=time(),\
+                         clientid=request.sid, n_publications=len(publications))
+    # </Parse json data>
+
+    # <Get the prompt results>
+    config.debug_wrapper(event="batch_classification", timestamp=time(),\
+                         clientid=request.sid,\
+                         message="calling classifier.prompt_publications()")
+
+    results: dict[str, dict[str, dict[str, str]]] =\
+        inference_pool.apply(classifier.prompt_publications, (publications,))
+
+    config.debug_wrapper(event="batch_classification", timestamp=time(),\
+                         clientid=request.sid,\
+                         message="classifier.prompt_publications() returned",\
+                         n_results=len(results['results']),\
+                         n_errors=len(results['errors']))
+    # </Get the prompt results>
+
+    config.debug_wrapper(event="batch_classification",\
+                         timestamp=time(),\
+                     clientid=request.sid, message="emit to the client.")
+
+    emit("classification_results_batch", results, to=request.sid)
+
 @socketio.on("disconnect")
 def disconnected(data: str = None):
     config.debug_wrapper(event="connect", timestamp=time(),\
@@ -0,0 +1,133 @@
+"""
+Compare the embedding backends of the *Categorizer*
+    (`CLASSIFIER_CATEGORIZER_BACKEND`) with the *float32* one ("TORCH").
+
+From `client/classifier/`, with the same `.env` as the service, once the ONNX
+    model is exported (`python -m model.categorizer.backends`):
+
+    python -m benchmarks.categorizer_backends [dataset.json]
+
+The texts are the ones of *dataset.json* (`CLASSIFIER_TFIDF_INPUT_FILE` by
+    default), each backend runs in its own process. It displays:
+
+    1. the parity: the cosine scores between the texts and the labels of
+        `data/labels.json`, compared with the ones of "TORCH", and how often
+        the top label of each vector of classification is the same.
+    2. the load time, the latency of one prompt, the time of the batches,
+        and the peak resident memory of the process.
+"""
+
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+
+import config
+from functions import load_json
+
+def _run_backend(backend_name: str, texts: list[str], label_texts: list[str],
+                 batch_size: int) -> dict[str, float | np.ndarray]:
+    # Imported here, the parent process never loads a model.
+    from model.categorizer.backends import load_backend, model_name
+
+    start_time: float = time.perf_counter()
+    model = load_backend(backend_name, model_name)
+    load_time: float = time.perf_counter() - start_time
+
+    label_embeddings: np.ndarray = model.encode(label_texts,
+                                                batch_size=batch_size)
+
+    # <Latency>, one prompt at a time, as `Categorizer.prompt()`.
+    n_prompts: int = min(len(texts), 50)
+
+    start_time = time.perf_counter()
+    for text in texts[:n_prompts]:
+        model.encode(text)
+    prompt_time: float = (time.perf_counter() - start_time) / n_prompts
+    # </Latency>
+
+    start_time = time.perf_counter()
+    embeddings: np.ndarray = model.encode(texts, batch_size=batch_size)
+    batch_time: float = time.perf_counter() - start_time
+
+    return {
+        'load_time': load_time,
+        'prompt_time': prompt_time,
+        'batch_time': batch_time,
+        # Kilobytes on Linux.
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        'embeddings': embeddings,
+        'label_embeddings': label_embeddings,
+    }
+
+def _cosine_scores(embeddings: np.ndarray,
+                   label_embeddings: np.ndarray) -> np.ndarray:
+    embeddings = embeddings\
+        / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    label_embeddings = label_embeddings\
+        / np.linalg.norm(label_embeddings, axis=1, keepdims=True)
+
+    return embeddings @ label_embeddings.T
+
+def benchmark(texts: list[str], labels: dict[str, dict[str, list[str]]],
+              backend_names: list[str], batch_size: int = 32) -> None:
+    # <Labels>, as `enhance_themes()` writes them.
+    label_texts: list[str] = []
+    label_columns: dict[str, slice] = {}
+
+    for classification_vector_name, themes_keywords in labels.items():
+        label_columns[classification_vector_name] =\
+            slice(len(label_texts), len(label_texts) + len(themes_keywords))
+        label_texts += [ '[ ' + theme + ' ] ' + ' '.join(keywords)\
+                         for theme, keywords in themes_keywords.items() ]
+    # </Labels>
+
+    # A new process per backend, for its memory.
+    context = multiprocessing.get_context("spawn")
+    reports: dict[str, dict[str, float | np.ndarray]] = {}
+
+    for backend_name in backend_names:
+        with context.Pool(processes=1) as pool:
+            reports[backend_name] = pool.apply(
+                _run_backend, (backend_name, texts, label_texts, batch_size)
+            )
+
+    reference: np.ndarray = _cosine_scores(
+        reports["TORCH"]['embeddings'], reports["TORCH"]['label_embeddings']
+    )
+
+    print(f'N={len(texts)} texts, {len(label_texts)} labels,\
+ batch_size={batch_size}.\n')
+    print(f'{"backend":>8} {"max_diff":>9} {"mean_diff":>9} {"top1_same":>9}\
+ {"load_s":>7} {"prompt_ms":>9} {"batch_s":>8} {"max_rss_mb":>10}')
+
+    for backend_name, report in reports.items():
+        scores: np.ndarray = _cosine_scores(report['embeddings'],
+                                            report['label_embeddings'])
+        differences: np.ndarray = np.abs(scores - reference)
+
+        top1_same: float = float(np.mean([
+            np.mean(scores[:, columns].argmax(axis=1)\
+                    == reference[:, columns].argmax(axis=1))\
+            for columns in label_columns.values()
+        ]))
+
+        print(f'{backend_name:>8} {differences.max():>9.5f}\
+ {differences.mean():>9.5f} {top1_same:>9.2%} {report["load_time"]:>7.2f}\
+ {report["prompt_time"] * 1000:>9.2f} {report["batch_time"]:>8.2f}\
+ {report["max_rss"] / 2**20:>10.0f}')
+
+if __name__ == '__main__':
+    dataset_file: str = sys.argv[1] if len(sys.argv) > 1\
+        else config.CLASSIFIER_TFIDF_INPUT_FILE
+    dataset: dict[str, dict[str, str]] = load_json(dataset_file)
+
+    benchmark(
+        texts=[ publication.get('text', "")\
+                for publication in dataset.values() ][:512],
+        labels=load_json('data/labels.json'),
+        backend_names=[ "TORCH", "INT8", "ONNX" ],
+        batch_size=config.CLASSIFIER_CATEGORIZER_BATCH_SIZE,
+    )
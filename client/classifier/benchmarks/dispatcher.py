@@ -0,0 +1,107 @@
+"""
+Compare the single events classified one at a time with the ones gathered
+    by `MicroBatcher` (see `dispatcher.py`).
+
+From `client/classifier/`, with the same `.env` as the service:
+
+    python -m benchmarks.dispatcher [dataset.json]
+
+With the texts of *dataset.json* (`CLASSIFIER_TFIDF_INPUT_FILE` by default),
+    and the model of the service, it displays:
+
+    1. the latency of a lone client (one event after another), p50 and p99.
+    2. the throughput of 64 concurrent clients.
+
+for `Classifier.prompt_generic()`, then for `MicroBatcher` (in `MAX_WORKERS`
+    threads, as the service).
+"""
+
+# Patched first, as the Gunicorn worker does.
+from gevent import monkey
+monkey.patch_all()
+
+import sys
+import time
+
+import gevent
+import gevent.threadpool
+import numpy as np
+
+import config
+from Classifier import Classifier
+from dispatcher import MicroBatcher
+from functions import load_json
+
+def lone_client(classify, texts: list[str]) -> tuple[float, float]:
+    """
+    :return: the p50 and the p99 of the latency (milliseconds).
+    """
+
+    latencies: list[float] = []
+
+    for text in texts:
+        start_time: float = time.perf_counter()
+        classify(text)
+        latencies.append(time.perf_counter() - start_time)
+
+    return tuple(np.percentile(latencies, [ 50, 99 ]) * 1000)
+
+def concurrent_clients(classify, texts: list[str],
+                       n_clients: int = 64) -> float:
+    """
+    :return: the number of events per second.
+    """
+
+    def client(offset: int) -> None:
+        for text in texts[offset::n_clients]:
+            classify(text)
+
+    start_time: float = time.perf_counter()
+    gevent.joinall([ gevent.spawn(client, offset)\
+                     for offset in range(n_clients) ])
+
+    return len(texts) / (time.perf_counter() - start_time)
+
+if __name__ == '__main__':
+    dataset_file: str = sys.argv[1] if len(sys.argv) > 1\
+        else config.CLASSIFIER_TFIDF_INPUT_FILE
+    texts: list[str] = [ publication.get('text', "")\
+                         for publication in load_json(dataset_file).values() ]
+
+    classifier = Classifier()
+    classifier.warm_up()
+
+    dispatcher = MicroBatcher(
+        process=lambda prompts: classifier.prompt_batch(prompts),
+        max_batch_size=config.CLASSIFIER_DISPATCHER_BATCH_SIZE,
+        max_delay=config.CLASSIFIER_DISPATCHER_DELAY,
+        max_queue_size=config.CLASSIFIER_DISPATCHER_QUEUE_SIZE,
+        threadpool=gevent.threadpool.ThreadPool(maxsize=config.MAX_WORKERS)
+    )
+
+    # <Same results>
+    direct: list[dict[str, str]] =\
+        [ classifier.prompt_generic(text) for text in texts[:200] ]
+    dispatched: list[dict[str, str]] = [ None ] * 200
+
+    def dispatch(i: int) -> None:
+        dispatched[i] = dispatcher.submit(texts[i])
+
+    gevent.joinall([ gevent.spawn(dispatch, i) for i in range(200) ])
+
+    if direct != dispatched:
+        raise Exception("MicroBatcher does not give the same results!")
+    # </Same results>
+
+    print(f'N={len(texts)} texts, batch_size=\
+{config.CLASSIFIER_DISPATCHER_BATCH_SIZE},\
+ delay={config.CLASSIFIER_DISPATCHER_DELAY * 1000:.0f}ms.\n')
+    print(f'{"":>14} {"lone_p50_ms":>11} {"lone_p99_ms":>11}\
+ {"64_clients_per_s":>16}')
+
+    for name, classify in [ ("prompt_generic", classifier.prompt_generic),
+                            ("MicroBatcher", dispatcher.submit) ]:
+        p50, p99 = lone_client(classify, texts[:200])
+        throughput: float = concurrent_clients(classify, texts)
+
+        print(f'{name:>14} {p50:>11.2f} {p99:>11.2f} {throughput:>16.0f}')
@@ -0,0 +1,163 @@
+"""
+Compare `Normalizer` and `normalize_many()` with the former
+    `preprocess_text()`.
+
+From `client/classifier/`, with the same `.env` as the service:
+
+    python -m benchmarks.normalizer
+
+It formats the texts of `CLASSIFIER_TFIDF_INPUT_FILE` with all of them, checks
+    that every stage is identical, and displays the time taken by each one.
+Then, it streams 20000 texts (the dataset repeated) through
+    `normalize_many()` with `CLASSIFIER_TFIDF_FORMATTING_WORKERS` processes.
+"""
+
+import itertools
+import os
+import re
+import tempfile
+import time
+
+import config
+from functions import load_json, Normalizer, normalize_many
+from functions import nltk, stopwords, ps, lemmatizer
+from lemma_table import LemmaTable
+
+def legacy_preprocess_text(text: str) -> dict[str, list[str | list[str]]]:
+    """
+    `preprocess_text()` before `Normalizer`, kept as the reference.
+    """
+    # <Cleaning and normalizing the text>
+    lowercased_text: str = text.lower()
+    remove_punctuation: str = re.sub(r'[^\w\s]', '', lowercased_text)
+    remove_white_space: str = remove_punctuation.strip()
+    # </Cleaning and normalizing the text>
+
+    # <Tokenization>
+    tokenized_text = nltk.word_tokenize(remove_white_space)
+    # </Tokenization>
+
+    # `set()` builds an unordered collection of unique elements.
+    stop_words: set[str] = set(stopwords.words('english'))
+
+    # <Remove stopwords> from the text i.e irrelevant words like "and".
+    stop_words_removed: list[str] = list(set([
+        word for word in tokenized_text \
+        if word not in stop_words
+    ]))
+    # </Remove stopwords>
+
+    # <Stemming>
+    stemmed_text: list[str] =\
+        set(list(ps.stem(word) for word in stop_words_removed))
+    # </Stemming>
+
+    # <Lemmatization>
+    lemmatized_text: list[str] =\
+        [ lemmatizer.lemmatize(word) for word in stop_words_removed ]
+    # </Lemmatization>
+
+    dataframe = {
+        'DOCUMENT': [text],
+        'LOWERCASE' : [lowercased_text],
+        'CLEANING': [remove_white_space],
+        'TOKENIZATION': [tokenized_text],
+        'STOP-WORDS': [stop_words_removed],
+        'STEMMING': [stemmed_text],
+        'LEMMATIZATION': [lemmatized_text],
+    }
+
+    return dataframe
+
+def benchmark(texts: list[str]) -> None:
+    normalizer = Normalizer()
+
+    # <Reference>
+    start_time: float = time.perf_counter()
+    expected: list[dict] = [ legacy_preprocess_text(text) for text in texts ]
+    legacy_time: float = time.perf_counter() - start_time
+    # </Reference>
+
+    start_time = time.perf_counter()
+    dataframes: list[dict] = [ normalizer.preprocess(text) for text in texts ]
+    preprocess_time: float = time.perf_counter() - start_time
+
+    # A new one, so its lemmatizer cache starts empty as well.
+    normalizer = Normalizer()
+
+    start_time = time.perf_counter()
+    lemmas: list[list[str]] = [ normalizer.lemmas(text) for text in texts ]
+    lemmas_time: float = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    texts_clean: list[str] = list(normalize_many(texts))
+    normalize_many_time: float = time.perf_counter() - start_time
+
+    # <Warm lemma table>, saved then loaded again, as at the next boot.
+    with tempfile.TemporaryDirectory() as directory:
+        lemmas_file: str = os.path.join(directory, "lemmas.tsv")
+
+        table = LemmaTable(lemmas_file)
+        table.update(normalizer.lemma_table.pop_new_lemmas())
+        table.save()
+
+        normalizer = Normalizer(lemma_table=LemmaTable(lemmas_file))
+        lemmas_file_size: int = os.path.getsize(lemmas_file)
+
+    start_time = time.perf_counter()
+    warm_lemmas: list[list[str]] = [ normalizer.lemmas(text) for text in texts ]
+    warm_lemmas_time: float = time.perf_counter() - start_time
+    # </Warm lemma table>
+
+    # <Identical outputs>
+    for i, text in enumerate(texts):
+        if dataframes[i] != expected[i]:
+            raise Exception(f'Normalizer.preprocess() differs for: {text}')
+
+        if lemmas[i] != expected[i]['LEMMATIZATION'][0]:
+            raise Exception(f'Normalizer.lemmas() differs for: {text}')
+
+        if warm_lemmas[i] != expected[i]['LEMMATIZATION'][0]:
+            raise Exception(f'The lemma table differs for: {text}')
+
+        if texts_clean[i] != ' '.join(expected[i]['LEMMATIZATION'][0]):
+            raise Exception(f'normalize_many() differs for: {text}')
+    # </Identical outputs>
+
+    print(f'N={len(texts)} texts, the outputs are identical.\n\
+legacy preprocess_text(): {legacy_time:.3f}s\n\
+Normalizer.preprocess(): {preprocess_time:.3f}s\n\
+Normalizer.lemmas(): {lemmas_time:.3f}s\n\
+normalize_many(): {normalize_many_time:.3f}s\n\
+Normalizer.lemmas(), warm lemma table of {len(normalizer.lemma_table)} words\
+ ({lemmas_file_size} bytes): {warm_lemmas_time:.3f}s\n\
+Speedup of the lemmas: x{legacy_time / lemmas_time:.1f}\n\
+Speedup of normalize_many(): x{legacy_time / normalize_many_time:.1f}')
+
+def benchmark_stream(texts: list[str], n_texts: int = 20000) -> None:
+    """
+    Stream *n_texts* texts, *texts* repeated, through `normalize_many()`.
+    """
+
+    workers: int = config.CLASSIFIER_TFIDF_FORMATTING_WORKERS
+    stream = itertools.islice(itertools.cycle(texts), n_texts)
+
+    start_time: float = time.perf_counter()
+    n_texts_clean: int = sum(1 for _ in normalize_many(
+        stream, chunksize=config.CLASSIFIER_TFIDF_FORMATTING_CHUNK_SIZE,
+        workers=workers
+    ))
+    stream_time: float = time.perf_counter() - start_time
+
+    print(f'normalize_many(): N={n_texts_clean} texts streamed in\
+ {stream_time:.3f}s with {workers} worker(s).')
+
+if __name__ == '__main__':
+    dataset: dict[str, dict[str, str]] =\
+        load_json(config.CLASSIFIER_TFIDF_INPUT_FILE)
+
+    texts: list[str] = [ publication.get('text', "")\
+                         for publication in dataset.values() ]
+
+    benchmark(texts)
+    benchmark_stream(texts)
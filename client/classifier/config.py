@@ -14,14 +14,39 @@ FLASK_DEBUG: bool=\
     True if os.getenv("FLASK_DEBUG") == "TRUE" else False
 FLASK_ALLOWED_ORIGINS: str = os.getenv("FLASK_ALLOWED_ORIGINS")
 FLASK_MAX_INPUT_LENGTH: int = int(os.getenv("FLASK_MAX_INPUT_LENGTH"))
+FLASK_MAX_BATCH_SIZE: int = int(os.getenv("FLASK_MAX_BATCH_SIZE", "64"))
 CLASSIFIER_DEBUG: bool =\
     True if os.getenv("CLASSIFIER_DEBUG") == "TRUE" else False
-MAX_WORKERS: int = 4
+MAX_WORKERS: int = int(os.getenv("MAX_WORKERS", "4"))
+CLASSIFIER_READY_TIMEOUT: float =\
+    float(os.getenv("CLASSIFIER_READY_TIMEOUT", "60"))
+CLASSIFIER_DISPATCHER_BATCH_SIZE: int =\
+    int(os.getenv("CLASSIFIER_DISPATCHER_BATCH_SIZE", "32"))
+CLASSIFIER_DISPATCHER_DELAY: float =\
+    float(os.getenv("CLASSIFIER_DISPATCHER_DELAY", "0.010"))
+CLASSIFIER_DISPATCHER_QUEUE_SIZE: int =\
+    int(os.getenv("CLASSIFIER_DISPATCHER_QUEUE_SIZE", "1024"))
 # </Flask + gevent + socketio>
 
 # <LLM Labellizer>
 CLASSIFIER_CATEGORIZER_USE: bool =\
     True if os.getenv("CLASSIFIER_CATEGORIZER_USE") == "TRUE" else False
+CLASSIFIER_CATEGORIZER_SAVE_EMBEDDINGS: bool =\
+    True if os.getenv("CLASSIFIER_CATEGORIZER_SAVE_EMBEDDINGS") == "TRUE"\
+    else False
+CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY: str =\
+    os.getenv("CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY",
+              "data/models/categorizer")
+CLASSIFIER_CATEGORIZER_BATCH_SIZE: int =\
+    int(os.getenv("CLASSIFIER_CATEGORIZER_BATCH_SIZE", "32"))
+CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE: bool =\
+    True if os.getenv("CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE") == "TRUE"\
+    else False
+CLASSIFIER_CATEGORIZER_BACKEND: str =\
+    os.getenv("CLASSIFIER_CATEGORIZER_BACKEND", "TORCH")
+CLASSIFIER_CATEGORIZER_ONNX_DIRECTORY: str =\
+    os.getenv("CLASSIFIER_CATEGORIZER_ONNX_DIRECTORY",
+              "data/models/categorizer/onnx")
 # </LLM Labellizer>
 
 # <Classification Models>
@@ -46,12 +71,49 @@ CLASSIFIER_TFIDF_IGNORE_WARNINGS: bool =\
     True if os.getenv("CLASSIFIER_TFIDF_IGNORE_WARNINGS") == "TRUE" else False
 CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN: bool =\
     True if os.getenv("CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN") == "TRUE" else False
+CLASSIFIER_TFIDF_FORMATTING_WORKERS: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_FORMATTING_WORKERS", "1"))
+CLASSIFIER_TFIDF_FORMATTING_CHUNK_SIZE: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_FORMATTING_CHUNK_SIZE", "64"))
 CLASSIFIER_TFIDF_DISPLAY_CROSSVALIDATION: bool =\
     True if os.getenv("CLASSIFIER_TFIDF_DISPLAY_CROSSVALIDATION") == "TRUE" else False
+CLASSIFIER_TFIDF_SAVE_MODEL: bool =\
+    True if os.getenv("CLASSIFIER_TFIDF_SAVE_MODEL") == "TRUE" else False
+CLASSIFIER_TFIDF_MODEL_DIRECTORY: str =\
+    os.getenv("CLASSIFIER_TFIDF_MODEL_DIRECTORY", "data/models/tfidf")
+CLASSIFIER_TFIDF_TRAINING_WORKERS: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_TRAINING_WORKERS", "1"))
+CLASSIFIER_TFIDF_SHARED_VECTORIZER: bool =\
+    True if os.getenv("CLASSIFIER_TFIDF_SHARED_VECTORIZER") == "TRUE" else False
+CLASSIFIER_TFIDF_FUSED_INFERENCE: bool =\
+    True if os.getenv("CLASSIFIER_TFIDF_FUSED_INFERENCE") == "TRUE" else False
+CLASSIFIER_TFIDF_INCREMENTAL: bool =\
+    True if os.getenv("CLASSIFIER_TFIDF_INCREMENTAL") == "TRUE" else False
+CLASSIFIER_TFIDF_HASHING_FEATURES: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_HASHING_FEATURES", "262144"))
+CLASSIFIER_TFIDF_RETRAIN_MIN_JACCARD: float =\
+    float(os.getenv("CLASSIFIER_TFIDF_RETRAIN_MIN_JACCARD", "0.3"))
+CLASSIFIER_TFIDF_RETRAIN_MAX_JACCARD_DROP: float =\
+    float(os.getenv("CLASSIFIER_TFIDF_RETRAIN_MAX_JACCARD_DROP", "0.05"))
+CLASSIFIER_TFIDF_COMPACT_MODEL: bool =\
+    True if os.getenv("CLASSIFIER_TFIDF_COMPACT_MODEL") == "TRUE" else False
+CLASSIFIER_TFIDF_PRUNE_THRESHOLD: float =\
+    float(os.getenv("CLASSIFIER_TFIDF_PRUNE_THRESHOLD", "0.0001"))
+CLASSIFIER_TFIDF_SEARCH_FILE: str =\
+    os.getenv("CLASSIFIER_TFIDF_SEARCH_FILE", "data/tfidf_search.json")
+CLASSIFIER_TFIDF_SEARCH_DIRECTORY: str =\
+    os.getenv("CLASSIFIER_TFIDF_SEARCH_DIRECTORY", "data/search/tfidf")
+CLASSIFIER_TFIDF_SEARCH_FOLDS: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_SEARCH_FOLDS", "5"))
+CLASSIFIER_TFIDF_SEARCH_WORKERS: int =\
+    int(os.getenv("CLASSIFIER_TFIDF_SEARCH_WORKERS", "1"))
 # </Classification Models>
 
 # <Tokenizer + Embeddings>
 NLTK_DIRECTORY: str = os.getenv("NLTK_DIRECTORY")
+NLTK_LEMMAS_FILE: str = os.getenv("NLTK_LEMMAS_FILE", "data/lemmas.tsv")
+NLTK_SYNONYMS_DIRECTORY: str =\
+    os.getenv("NLTK_SYNONYMS_DIRECTORY", "data/synonyms")
 SPACY_MODEL: str = os.getenv("SPACY_MODEL")
 CLASSIFIER_MISCELLANEOUS_USE: bool =\
     True if os.getenv("CLASSIFIER_MISCELLANEOUS_USE") == "TRUE"\
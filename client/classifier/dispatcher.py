@@ -0,0 +1,123 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+import gevent
+import gevent.pool
+import gevent.queue
+import gevent.threadpool
+from gevent.event import AsyncResult
+
+class MicroBatcher:
+    def __init__(self, process: Callable[[list[Any]], list[Any]],
+                 max_batch_size: int = 32, max_delay: float = 0.010,
+                 max_queue_size: int = 1024,
+                 threadpool: gevent.threadpool.ThreadPool | None = None):
+        """
+        Gather the items submitted by concurrent greenlets (one per event)
+            into batches, gathered by a single greenlet, and give each
+            greenlet its own result back.
+
+        :param process: processes a batch, returns one result per item, in
+            the same order, as `Classifier.prompt_batch()`.
+        :param max_batch_size: a batch is processed once it has this size...
+        :param max_delay: ... or once this time (seconds) has passed since its
+            first item.
+        :param max_queue_size: the max number of waiting items, see
+            `self.submit()`.
+        :param threadpool: runs *process* in its native threads, so the
+            event loop only waits for the results, with at most
+            `threadpool.maxsize` batches at once. By default, *process* runs
+            in the greenlet of the batcher, one batch at a time.
+
+        An item alone is processed at once, without waiting for
+            *max_delay*: a batch only waits for more items when others are
+            already waiting (and while a batch is processed, the next items
+            gather in the queue).
+        """
+
+        self._process = process
+        self._max_batch_size: int = max_batch_size
+        self._max_delay: float = max_delay
+
+        self._queue = gevent.queue.Queue(maxsize=max_queue_size)
+        self._worker: gevent.Greenlet | None = None
+
+        self._threadpool = threadpool
+        self._flushes: gevent.pool.Pool | None =\
+            gevent.pool.Pool(size=threadpool.maxsize)\
+            if threadpool is not None else None
+
+    def submit(self, item: Any) -> Any:
+        """
+        :param item: an item of the batch given to *process*.
+        :return: its result, the calling greenlet waits for it.
+
+        It raises an Exception if the queue is full, or the one raised by
+            *process*.
+        """
+
+        result = AsyncResult()
+
+        try:
+            self._queue.put_nowait((item, result))
+        except gevent.queue.Full:
+            raise Exception('Too many classifications are waiting,\
+ try again later.')
+
+        # Started here, in the process of the Gunicorn worker.
+        if self._worker is None or self._worker.dead:
+            self._worker = gevent.spawn(self._run)
+
+        return result.get()
+
+    def _run(self) -> None:
+        while True:
+            batch: list[tuple[Any, AsyncResult]] = [ self._queue.get() ]
+
+            # <Gather>, what is already waiting, then, if there was
+            # something, what comes before *max_delay*.
+            while len(batch) < self._max_batch_size\
+                    and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            deadline: float = time.monotonic() + self._max_delay
+
+            while 1 < len(batch) < self._max_batch_size:
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except gevent.queue.Empty:
+                    break
+            # </Gather>
+
+            if self._flushes is None:
+                self._flush(batch)
+            else:
+                # Waits for a free thread, the next items gather meanwhile.
+                self._flushes.spawn(self._flush, batch)
+
+    def _flush(self, batch: list[tuple[Any, AsyncResult]]) -> None:
+        try:
+            items: list[Any] = [ item for item, _ in batch ]
+
+            if self._threadpool is None:
+                results: list[Any] = self._process(items)
+            else:
+                results: list[Any] = self._threadpool.apply(self._process,
+                                                            (items,))
+
+            if len(results) != len(batch):
+                raise Exception(f'{len(results)} results for a batch of\
+ {len(batch)} items.')
+
+        except Exception as e:
+            for _, result in batch:
+                result.set_exception(e)
+            return
+
+        for (_, result), value in zip(batch, results):
+            result.set(value)
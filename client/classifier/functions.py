@@ -1,26 +1,34 @@
+import atexit
 import json
 import re
 import os
+import itertools
+import concurrent.futures
+import multiprocessing
+from collections.abc import Iterable, Iterator
 
 import config
 
-# <Download *nltk* tools aka MISCELLANEOUS>
+# <Check *nltk* tools aka MISCELLANEOUS>, they are downloaded beforehand
+#       by `python nltk_resources.py`, so there is no network I/O here.
 if config.CLASSIFIER_MISCELLANEOUS_USE or config.CLASSIFIER_TFIDF_USE:
     import nltk
     from nltk.corpus import stopwords, wordnet
     from nltk.stem import PorterStemmer, WordNetLemmatizer
 
+    import nltk_resources
+    from lemma_table import LemmaTable
+
+    nltk_resources.check(config.NLTK_DIRECTORY)
+
     # This one is searching in the `nltk_data/` dir.
-    nltk.download('punkt_tab', download_dir=config.NLTK_DIRECTORY)
-    nltk.download(info_or_id='stopwords', download_dir=config.NLTK_DIRECTORY)
-    nltk.download(info_or_id='wordnet', download_dir=config.NLTK_DIRECTORY)
-    nltk.download('omw-1.4', download_dir=config.NLTK_DIRECTORY)
-    nltk.download('averaged_perceptron_tagger_eng',\
-                  download_dir=config.NLTK_DIRECTORY)
+    nltk.data.path.insert(0, config.NLTK_DIRECTORY)
 
+    # Both are lazy: *WordNet* and the tokenizer are loaded by *nltk*
+    # on their first use, not here.
     ps = PorterStemmer()
     lemmatizer = WordNetLemmatizer()
-# </Download *nltk* tools aka MISCELLANEOUS>
+# </Check *nltk* tools aka MISCELLANEOUS>
 
 def load_json(file_path: str) -> str:
     if not os.path.exists(file_path):
@@ -33,6 +41,167 @@ def load_json(file_path: str) -> str:
 ### INPUT NORMALIZATION FUNCTIONS
 ###############################################################################
 
+# <Compiled tokenizer>, once the punctuation is removed, a text holds only
+# words and white spaces, so `nltk.word_tokenize()` merely splits it on the
+# white spaces, except for a few contractions it splits in two words.
+punctuation_pattern: re.Pattern = re.compile(r'[^\w\s]')
+
+contractions: dict[str, str] = {
+    'cannot': "can not",
+    'gimme': "gim me",
+    'gonna': "gon na",
+    'gotta': "got ta",
+    'lemme': "lem me",
+    'wanna': "wan na",
+}
+contractions_pattern: re.Pattern =\
+    re.compile(r'\b(' + '|'.join(contractions) + r')\b')
+# </Compiled tokenizer>
+
+# <Normalizer version>, increment it whenever `Normalizer` gives other lemmas
+#           for the same text (the tokenizer, the stopwords...), so the saved
+#           `text_clean` are formatted again, see `Normalizer.version()`.
+FORMAT_VERSION: int = 1
+# </Normalizer version>
+
+class Normalizer:
+    def __init__(self, language: str = 'english',
+                 lemma_table: LemmaTable | None = None):
+        """
+        The text normalization of `preprocess_text()`, compiled once.
+
+        :param language: the language of the stopwords.
+        :param lemma_table: the lemmas already known, see `LemmaTable`,
+            in memory only by default.
+
+        1. The stopwords are a `frozenset`, built once instead of at each call.
+        2. The lemmatizer is memoized by *lemma_table*, a word of the
+            vocabulary is lemmatized once for all the texts.
+        3. `self.lemmas()` computes only what the models use, the lemmas,
+            without the stemming and the intermediate stages.
+        4. The tokenizer is a compiled regex, with the same tokens as
+            `nltk.word_tokenize()` on a text without punctuation.
+        """
+
+        self._language: str = language
+        self._stop_words: frozenset[str] | None = None # On first use.
+        self.lemma_table: LemmaTable = lemma_table\
+            if lemma_table is not None else LemmaTable()
+
+    def version(self) -> str:
+        """
+        :return: `FORMAT_VERSION` and the version of *WordNet* (see
+            `LemmaTable`): the same text gives the same lemmas with the same
+            version.
+        """
+        return f'{FORMAT_VERSION} {self.lemma_table.version()}'
+
+    def _lemmatize(self, word: str) -> str:
+        lemma: str | None = self.lemma_table.get(word)
+
+        if lemma is None:
+            lemma = lemmatizer.lemmatize(word)
+            self.lemma_table.add(word, lemma)
+
+        return lemma
+
+    def _tokens(self, text: str) -> tuple[str, str, list[str]]:
+        # <Cleaning and normalizing the text>
+        lowercased_text: str = text.lower()
+        remove_punctuation: str =\
+            punctuation_pattern.sub('', lowercased_text)
+        remove_white_space: str = remove_punctuation.strip()
+        # </Cleaning and normalizing the text>
+
+        # <Tokenization>, see `contractions`.
+        tokenized_text: list[str] = contractions_pattern.sub(
+            lambda match: contractions[match.group(1)], remove_white_space
+        ).split()
+        # </Tokenization>
+
+        return lowercased_text, remove_white_space, tokenized_text
+
+    def _remove_stop_words(self, tokenized_text: list[str]) -> list[str]:
+        if self._stop_words is None:
+            self._stop_words = frozenset(stopwords.words(self._language))
+
+        # Same order as `preprocess_text()`, the lemmas are written in the
+        # order of this `set()`.
+        return list(set([
+            word for word in tokenized_text \
+            if word not in self._stop_words
+        ]))
+
+    def lemmas(self, text: str) -> list[str]:
+        """
+        :param text: A text, everything.
+        :return: `preprocess_text(text)['LEMMATIZATION'][0]`.
+        """
+
+        _, _, tokenized_text = self._tokens(text)
+
+        return [ self._lemmatize(word)\
+                for word in self._remove_stop_words(tokenized_text) ]
+
+    def text_clean(self, text: str) -> str:
+        """
+        :return: the lemmas joined by spaces, the `text_clean` of the models.
+        """
+        return ' '.join(self.lemmas(text))
+
+    def texts_clean(self, texts: list[str]) -> list[str]:
+        """
+        :return: `[ self.text_clean(text) for text in texts ]`, but each
+            distinct word of *texts* is lemmatized once.
+        """
+
+        words_of_texts: list[list[str]] = [
+            self._remove_stop_words(self._tokens(text)[2]) for text in texts
+        ]
+
+        lemmas: dict[str, str] = {
+            word: self._lemmatize(word)\
+            for word in set(itertools.chain.from_iterable(words_of_texts))
+        }
+
+        return [ ' '.join([ lemmas[word] for word in words ])\
+                 for words in words_of_texts ]
+
+    def preprocess(self, text: str) -> dict[str, list[str | list[str]]]:
+        """
+        See `preprocess_text()`.
+        """
+
+        lowercased_text, remove_white_space, tokenized_text =\
+            self._tokens(text)
+
+        # <Remove stopwords> from the text i.e irrelevant words like "and".
+        stop_words_removed: list[str] =\
+            self._remove_stop_words(tokenized_text)
+        # </Remove stopwords>
+
+        # <Stemming>
+        stemmed_text: list[str] =\
+            set(list(ps.stem(word) for word in stop_words_removed))
+        # </Stemming>
+
+        # <Lemmatization>
+        lemmatized_text: list[str] =\
+            [ self._lemmatize(word) for word in stop_words_removed ]
+        # </Lemmatization>
+
+        dataframe = {
+            'DOCUMENT': [text],
+            'LOWERCASE' : [lowercased_text],
+            'CLEANING': [remove_white_space],
+            'TOKENIZATION': [tokenized_text],
+            'STOP-WORDS': [stop_words_removed],
+            'STEMMING': [stemmed_text],
+            'LEMMATIZATION': [lemmatized_text],
+        }
+
+        return dataframe
+
 def preprocess_text(text: str) -> dict[str, list[str | list[str]]]:
     """
             !!! Works only for English text. !!!
@@ -47,48 +216,72 @@ def preprocess_text(text: str) -> dict[str, list[str | list[str]]]:
 
     :param text: A text, everything.
     :return: something like a dataframe.
+
+    Only the lemmas are needed? See `normalizer.lemmas()`.
     """
-    # <Cleaning and normalizing the text>
-    lowercased_text: str = text.lower()
-    remove_punctuation: str = re.sub(r'[^\w\s]', '', lowercased_text)
-    remove_white_space: str = remove_punctuation.strip()
-    # </Cleaning and normalizing the text>
-
-    # <Tokenization>
-    tokenized_text = nltk.word_tokenize(remove_white_space)
-    # </Tokenization>
-
-    # `set()` builds an unordered collection of unique elements.
-    stop_words: set[str] = set(stopwords.words('english'))
-
-    # <Remove stopwords> from the text i.e irrelevant words like "and".
-    stop_words_removed: list[str] = list(set([
-        word for word in tokenized_text \
-        if word not in stop_words
-    ]))
-    # </Remove stopwords>
-
-    # <Stemming>
-    stemmed_text: list[str] =\
-        set(list(ps.stem(word) for word in stop_words_removed))
-    # </Stemming>
-
-    # <Lemmatization>
-    lemmatized_text: list[str] =\
-        [ lemmatizer.lemmatize(word) for word in stop_words_removed ]
-    # </Lemmatization>
-
-    dataframe = {
-        'DOCUMENT': [text],
-        'LOWERCASE' : [lowercased_text],
-        'CLEANING': [remove_white_space],
-        'TOKENIZATION': [tokenized_text],
-        'STOP-WORDS': [stop_words_removed],
-        'STEMMING': [stemmed_text],
-        'LEMMATIZATION': [lemmatized_text],
-    }
+    return normalizer.preprocess(text)
 
-    return dataframe
+# <Shared normalizer>, its new lemmas are saved by the training and at exit.
+if config.CLASSIFIER_MISCELLANEOUS_USE or config.CLASSIFIER_TFIDF_USE:
+    normalizer = Normalizer(lemma_table=LemmaTable(
+        config.NLTK_LEMMAS_FILE,
+        version=nltk_resources.read_checksums(config.NLTK_DIRECTORY)\
+            .get('wordnet', "")
+    ))
+
+    atexit.register(normalizer.lemma_table.save)
+# </Shared normalizer>
+
+def normalize_many(texts: Iterable[str], chunksize: int = 64,
+                   workers: int = 1) -> Iterator[str]:
+    """
+    :param texts: raw texts, any iterable (a list, a generator, a file...).
+    :param chunksize: the number of texts normalized together, see
+        `Normalizer.texts_clean()`.
+    :param workers: the number of processes that normalize the chunks,
+        the texts are normalized in this process with `1`.
+    :return: a generator of the `text_clean` of each text, in the same order.
+
+    The texts are read chunk by chunk, with at most `workers` chunks
+        in flight, so a dataset of any size is never held in memory at once.
+    """
+
+    iterator: Iterator[str] = iter(texts)
+    chunks: Iterator[list[str]] =\
+        iter(lambda: list(itertools.islice(iterator, chunksize)), [])
+
+    if workers <= 1:
+        for chunk in chunks:
+            yield from normalizer.texts_clean(chunk)
+        return
+
+    # The lemmas of the processes are merged into the table of this one.
+    # They are spawned, not forked from the service, which runs under
+    # *gevent*. There, the thread that sends the chunks is a greenlet, whose
+    # write blocks this thread once the pipe is full: a chunk is only sent
+    # once a process is idle, to read it, otherwise it could wait for this
+    # thread to read its result.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")) as executor:
+        pending: list[concurrent.futures.Future] = [
+            executor.submit(_normalize_chunk, chunk)\
+            for chunk in itertools.islice(chunks, workers)
+        ]
+
+        while len(pending) != 0:
+            texts_clean, new_lemmas = pending.pop(0).result()
+            normalizer.lemma_table.update(new_lemmas)
+
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(executor.submit(_normalize_chunk, chunk))
+
+            yield from texts_clean
+
+def _normalize_chunk(texts: list[str]) -> tuple[list[str], dict[str, str]]:
+    # Module-level so that `ProcessPoolExecutor` can run it.
+    texts_clean: list[str] = normalizer.texts_clean(texts)
+
+    return texts_clean, normalizer.lemma_table.pop_new_lemmas()
 
 def get_synonyms(word: str) -> set[str]:
     """
@@ -158,14 +351,26 @@ def expand_keywords_with_synonyms(unique_keywords: dict[str, set[str]]):
         }
     }
     """
+    # <Synonym index>, the synonyms of the keywords of `data/labels.json`
+    # are precomputed (see `synonym_index.py`), the other keywords walk
+    # *WordNet*. Imported here, it imports this module.
+    import synonym_index
+
+    index = synonym_index.index()
+    # </Synonym index>
+
     expanded_keywords_with_synonyms: dict[str, set[str]] = {}
 
     for theme in unique_keywords:
         for keyword in unique_keywords[theme]:
+            synonyms: set[str] | None = index.synonyms(keyword)
+            if synonyms is None:
+                synonyms = get_synonyms(keyword)
+
             if theme not in expanded_keywords_with_synonyms:
-                expanded_keywords_with_synonyms[theme] = get_synonyms(keyword)
+                expanded_keywords_with_synonyms[theme] = synonyms
             else:
-                expanded_keywords_with_synonyms[theme].update(get_synonyms(keyword))
+                expanded_keywords_with_synonyms[theme].update(synonyms)
 
     return expanded_keywords_with_synonyms
 
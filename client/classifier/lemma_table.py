@@ -0,0 +1,128 @@
+import os
+import threading
+
+class LemmaTable:
+    def __init__(self, file_path: str = "", version: str = "",
+                 max_words: int = 500000):
+        """
+        A persistent *word -> lemma* table, shared by the training (the
+            formatting of the dataset) and the prompts, so a word already
+            seen is lemmatized with a single lookup instead of *WordNet*.
+
+        :param file_path: the sorted file of the table, see
+            `NLTK_LEMMAS_FILE`. Nothing is read or written with "".
+        :param version: the version of the lemmatizer, the *sha256* of
+            *WordNet*. A file written with another version is ignored,
+            and replaced at the next `self.save()`.
+        :param max_words: the table does not grow beyond it, the next new
+            words are lemmatized by *WordNet* at each call.
+
+        The file is sorted by word, one word per line, with its lemma after a
+            tab when it is not the word itself:
+
+        ```
+        # lemmas <version>
+        network
+        networks	network
+        ```
+        """
+
+        self._file_path: str = file_path
+        self._version: str = version
+        self._max_words: int = max_words
+
+        self._lemmas: dict[str, str] = {}
+        # The words added since the last `self.save()`.
+        self._new_lemmas: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self._lemmas.update(self._read())
+
+    def version(self) -> str:
+        """
+        :return: the version of the lemmatizer, see `__init__()`.
+        """
+        return self._version
+
+    def get(self, word: str) -> str | None:
+        return self._lemmas.get(word)
+
+    def add(self, word: str, lemma: str) -> None:
+        with self._lock:
+            if len(self._lemmas) >= self._max_words:
+                return
+
+            self._lemmas[word] = lemma
+            self._new_lemmas[word] = lemma
+
+    def update(self, lemmas: dict[str, str]) -> None:
+        """
+        Add the new lemmas of another process, see `self.pop_new_lemmas()`.
+        """
+
+        for word, lemma in lemmas.items():
+            if word not in self._lemmas:
+                self.add(word, lemma)
+
+    def pop_new_lemmas(self) -> dict[str, str]:
+        """
+        :return: the words added since the last call, they are then only
+            saved by the process that receives them.
+        """
+
+        with self._lock:
+            new_lemmas: dict[str, str] = self._new_lemmas
+            self._new_lemmas = {}
+
+        return new_lemmas
+
+    def save(self) -> None:
+        """
+        Merge the new words into the file, with the ones written meanwhile by
+            the other processes (the gunicorn workers, a training...).
+        The file is replaced atomically.
+        """
+
+        if self._file_path == "" or len(self._new_lemmas) == 0:
+            return
+
+        with self._lock:
+            lemmas: dict[str, str] = self._read()
+            lemmas.update(self._lemmas)
+
+            self._lemmas.update(lemmas)
+            self._new_lemmas = {}
+
+            lines: list[str] = [ f'# lemmas {self._version}' ] + [
+                word if lemma == word else f'{word}\t{lemma}'\
+                for word, lemma in sorted(lemmas.items())
+            ]
+
+            os.makedirs(os.path.dirname(self._file_path) or ".", exist_ok=True)
+            tmp_file: str = f'{self._file_path}.{os.getpid()}.tmp'
+
+            with open(tmp_file, 'w') as pwf:
+                pwf.write('\n'.join(lines) + '\n')
+
+            os.replace(tmp_file, self._file_path)
+
+    def __len__(self) -> int:
+        return len(self._lemmas)
+
+    def _read(self) -> dict[str, str]:
+        if self._file_path == "" or not os.path.exists(self._file_path):
+            return {}
+
+        lemmas: dict[str, str] = {}
+
+        with open(self._file_path, 'r') as prf:
+            if prf.readline().rstrip('\n') != f'# lemmas {self._version}':
+                print(f'{self._file_path} was written by another version of\
+ the lemmatizer, it is ignored.')
+                return {}
+
+            for line in prf:
+                word, _, lemma = line.rstrip('\n').partition('\t')
+                lemmas[word] = lemma or word
+
+        return lemmas
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+class ModelLifecycle:
+    # <States>, in this order, or "failed" if the loading raised.
+    COLD: str = "cold"
+    LOADING: str = "loading"
+    WARMING: str = "warming"
+    READY: str = "ready"
+    FAILED: str = "failed"
+    # </States>
+
+    def __init__(self, load: Callable[[], Any],
+                 warm_up: Callable[[Any], None] | None = None):
+        """
+        Load the models away from the import, so the service accepts the
+            connections while they are loading, and knows when they can
+            answer.
+
+        :param load: builds the models, as `Classifier`.
+        :param warm_up: runs a synthetic prompt through the models built by
+            *load*, as `Classifier.warm_up`.
+
+        The state is only written by the loading thread, and read by
+            everyone (see `self.status()` and `self.get()`).
+        """
+
+        self._load = load
+        self._warm_up = warm_up
+
+        self.state: str = self.COLD
+        self._models: Any = None
+        self._error: str = ""
+        self._since: float = time.time()
+
+        self._started: bool = False
+        self._lock = threading.Lock()
+
+    def start(self, spawn: Callable[[Callable[[], None]], Any] | None = None)\
+            -> None:
+        """
+        Start the loading in the background, once.
+
+        :param spawn: runs a function in a thread, a native thread by
+            default. Under *gevent*, take `gevent.get_hub().threadpool.spawn`,
+            a thread which is not a greenlet, otherwise the event loop waits
+            for the loading.
+        """
+
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        if spawn is None:
+            threading.Thread(target=self._run, daemon=True).start()
+        else:
+            spawn(self._run)
+
+    def _run(self) -> None:
+        try:
+            self._set_state(self.LOADING)
+            models: Any = self._load()
+
+            self._set_state(self.WARMING)
+            if self._warm_up is not None:
+                self._warm_up(models)
+
+            self._models = models
+            self._set_state(self.READY)
+
+        except Exception as e:
+            self._error = str(e)
+            self._set_state(self.FAILED)
+            print(f'{e}')
+
+    def _set_state(self, state: str) -> None:
+        print(f'Models {state} (after {time.time() - self._since:.1f}s in\
+ {self.state}).')
+
+        self.state = state
+        self._since = time.time()
+
+    def status(self) -> dict[str, str | float]:
+        """
+        :return: the readiness probe, as
+            `{ 'state': "loading", 'since': 3.2, 'error': "" }`, *since* is
+            the number of seconds in this state.
+        """
+
+        return {
+            'state': self.state,
+            'since': round(time.time() - self._since, 1),
+            'error': self._error,
+        }
+
+    def ready(self) -> bool:
+        return self.state == self.READY
+
+    def get(self, timeout: float = 0.0,
+            sleep: Callable[[float], Any] = time.sleep) -> Any:
+        """
+        :param timeout: the number of seconds to wait for the models, 0 to
+            not wait.
+        :param sleep: waits between two checks of the state, as
+            `socketio.sleep`, so under *gevent* only the calling greenlet
+            waits.
+        :return: the models, once ready.
+
+        It raises an Exception if the models are not ready in time, or
+            failed to load.
+        """
+
+        deadline: float = time.monotonic() + timeout
+
+        while self.state not in (self.READY, self.FAILED)\
+                and time.monotonic() < deadline:
+            sleep(0.1)
+
+        if self.state == self.FAILED:
+            raise Exception(f'The models failed to load: {self._error}')
+
+        if self.state != self.READY:
+            raise Exception(f'The models are not ready yet ({self.state}),\
+ try again later.')
+
+        return self._models
@@ -1,15 +1,33 @@
+import hashlib
 import json
+import os
 import re
 
+import config
 from generic_app import Service
+from model.categorizer.embedding_cache import EmbeddingCache
 
-# <Transformers>
-from sentence_transformers import SentenceTransformer, util
+# <Transformers>, see `CLASSIFIER_CATEGORIZER_BACKEND`.
+from sentence_transformers import util
 import numpy as np
 
-model = SentenceTransformer('all-MiniLM-L6-v2')
+from model.categorizer.backends import load_backend, model_name
+
+# Loaded by the first `Categorizer()`, not at import, see `load_model()`.
+model = None
 # </Transformers>
 
+def load_model():
+    """
+    :return: the backend of `CLASSIFIER_CATEGORIZER_BACKEND`, loaded once.
+    """
+
+    global model
+
+    if model is None:
+        model = load_backend(config.CLASSIFIER_CATEGORIZER_BACKEND, model_name)
+    return model
+
 class Categorizer(Service):
     def __init__(self, labels: dict[str, dict[str, list[str]]],
                  precisions: dict[str, dict[str, float | str]]):
@@ -89,53 +107,321 @@ class Categorizer(Service):
         self.name = "LLM sentence-transformers HuggingFace"
         super().__init__(labels=labels, precisions=precisions)
 
-    def prompt(self, prompt: str) -> dict[str, str]:
+        load_model()
+
+        # <Label embeddings>, they only depend on `data/labels.json`,
+        # so they are encoded once, see `self._embed_labels()`.
+        self._label_embeddings: np.ndarray = self._embed_labels()
+
+        # For each vector of classification, the row of its utility check
+        # and the rows of its labels in `self._label_embeddings`.
+        self._label_rows: dict[str, tuple[int, slice]] = {}
+
+        row: int = 0
+        for label in self._labels:
+            n_themes: int = len(self._labels[label])
+            self._label_rows[label] = (row, slice(row + 1, row + 1 + n_themes))
+            row += 1 + n_themes
+        # </Label embeddings>
+
+        # <Publication embeddings>, see `self._encode()`.
+        self._embedding_cache: EmbeddingCache | None = EmbeddingCache(
+            os.path.join(config.CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY,
+                         "embeddings", model_name + "." + model.name),
+            dimension=model.get_sentence_embedding_dimension()
+        ) if config.CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE else None
+        # </Publication embeddings>
+
+    def prompt(self, prompt: str, doi: str = "") -> dict[str, str]:
         """
         :param prompt: it is a text, see `Classifier.prompt_generic()`.
+        :param doi: the DOI of the publication, if any, see `self._encode()`.
         :return: The classification result over all the labels,
             see `Classifier.prompt_generic()`.
 
-        It merely calls `unsupervised_cosine_similarity()`
-            for every label.
+        The prompt is encoded once, and compared with every row of
+            `self._label_embeddings` at once. Then, `select_themes()` is
+            called for every label on its own scores.
         """
         def func_prompt(prompt):
-            results: dict[str, str] = {}
+            # <Compute similarities>, the only forward pass of the model.
+            publication_embedding: np.ndarray =\
+                self._encode([ prompt ], [ doi ])[0]
+            cosine_scores: np.ndarray = util.cos_sim(
+                publication_embedding, self._label_embeddings
+            )[0].numpy()
+            # </Compute similarities>
+
+            return self._select_labels(cosine_scores)
+
+        return self.generic_prompt(func_prompt, prompt)
 
-            for label in self._labels:
-                label_keywords: list[str] = self._labels[label]
+    def prompt_batch(self, prompts: list[str], batch_size: int = 32,
+                     dois: list[str] | None = None) -> list[dict[str, str]]:
+        """
+        :param prompts: some texts, see `Classifier.prompt_generic()`.
+        :param batch_size: the number of texts encoded together.
+        :param dois: the DOI of each text, if any, see `self._encode()`.
+        :return: The classification results, in the same order as *prompts*,
+            see `self.prompt()`.
+
+        The texts are sorted by length, so a batch holds texts of the same
+            size and is barely padded, then encoded by batches. The rules of
+            `select_themes()` are applied to the whole batch at once
+            (see `self._select_labels_batch()`).
+        """
 
-                label_precisions: dict[str, float | str] =\
-                    self._precisions.get(label, [])
+        def func_prompt(prompts):
+            return self._select_labels_batch(
+                self.cosine_scores(prompts, batch_size=batch_size, dois=dois)
+            )
 
-                label_precision: float =\
-                    label_precisions.get('precision', None)
+        return self.generic_prompt(func_prompt, prompts)
 
-                label_threshold: float =\
-                    label_precisions.get('threshold', None)
+    def cosine_scores(self, texts: list[str], batch_size: int = 32,
+                      dois: list[str] | None = None) -> np.ndarray:
+        """
+        :param texts: see `self.prompt_batch()`.
+        :return: one row per text, in the same order, the cosine similarity
+            between the text and each row of `self._label_embeddings`
+            (see `self.label_scores()`).
+        """
 
-                # <Utility Check> if the parent label is not the *extra class*.
-                label_parent: str =\
-                    label_precisions.get('parent', None)
+        # <Sort by length>
+        order: np.ndarray = np.argsort([ -len(text) for text in texts ],
+                                       kind='stable')
+        # </Sort by length>
 
-                if label_parent != None:
-                    if results.get(label_parent, "[]") == "[]":
-                        results[label] = "[]"
-                        continue
-                # </Utility Check>
+        publication_dois: list[str] = dois\
+            if dois is not None else [ "" ] * len(texts)
 
-                results[label] = json.dumps(
-                    unsupervised_cosine_similarity(prompt, label_keywords,\
-                        threshold=label_threshold, precision=label_precision)
-                )
+        publication_embeddings: np.ndarray = self._encode(
+            [ texts[i] for i in order ],
+            [ publication_dois[i] for i in order ], batch_size=batch_size
+        )
 
-            return results
+        cosine_scores: np.ndarray = np.empty(
+            (len(texts), len(self._label_embeddings)), dtype=np.float32
+        )
+        cosine_scores[order] = util.cos_sim(publication_embeddings,
+                                            self._label_embeddings).numpy()
 
-        return self.generic_prompt(func_prompt, prompt)
+        return cosine_scores
+
+    def label_scores(self, cosine_scores: np.ndarray, label: str)\
+                                            -> tuple[np.ndarray, np.ndarray]:
+        """
+        :param cosine_scores: see `self.cosine_scores()`.
+        :param label: a vector of classification, as `challenges`.
+        :return: the scores of its utility check (one per text), and the
+            scores of its labels (one row per text, in the order of
+            `data/labels.json`).
+        """
+
+        utility_row, themes_rows = self._label_rows[label]
+        return cosine_scores[:, utility_row], cosine_scores[:, themes_rows]
+
+    def _encode(self, texts: list[str], dois: list[str],
+                batch_size: int = 32) -> np.ndarray:
+        """
+        :return: the embedding of each text.
+
+        With `CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE`, the embeddings are
+            looked up in `self._embedding_cache` (by DOI and text) first,
+            and only the missing texts are encoded, then added to it.
+            Classifying the same publications again with other
+            thresholds or precisions does not use the model anymore.
+        """
+
+        if self._embedding_cache is None:
+            return model.encode(texts, batch_size=batch_size)
+
+        keys: list[str] = [
+            EmbeddingCache.key(text, doi) for text, doi in zip(texts, dois)
+        ]
+        embeddings, missing = self._embedding_cache.get(keys)
+
+        if len(missing) != 0:
+            new_embeddings: np.ndarray = model.encode(
+                [ texts[i] for i in missing ], batch_size=batch_size
+            )
+
+            embeddings[missing] = new_embeddings
+            self._embedding_cache.put([ keys[i] for i in missing ],
+                                      new_embeddings)
+
+        return embeddings
+
+    def _select_labels(self, cosine_scores: np.ndarray) -> dict[str, str]:
+        """
+        :param cosine_scores: the cosine similarity between a text and each
+            row of `self._label_embeddings`.
+        :return: see `self.prompt()`.
+        """
+
+        results: dict[str, str] = {}
+
+        for label in self._labels:
+            label_keywords: dict[str, list[str]] = self._labels[label]
+
+            label_precisions: dict[str, float | str] =\
+                self._precisions.get(label, [])
+
+            label_precision: float =\
+                label_precisions.get('precision', None)
+
+            label_threshold: float =\
+                label_precisions.get('threshold', None)
+
+            # <Utility Check> if the parent label is not the *extra class*.
+            label_parent: str =\
+                label_precisions.get('parent', None)
+
+            if label_parent != None:
+                if results.get(label_parent, "[]") == "[]":
+                    results[label] = "[]"
+                    continue
+            # </Utility Check>
+
+            utility_row, themes_rows = self._label_rows[label]
+
+            results[label] = json.dumps(
+                select_themes(list(label_keywords.keys()),
+                              cosine_scores[utility_row:utility_row + 1],
+                              cosine_scores[themes_rows],
+                              threshold=label_threshold,
+                              precision=label_precision)
+            )
+
+        return results
+
+    def _select_labels_batch(self, cosine_scores: np.ndarray)\
+                                                    -> list[dict[str, str]]:
+        """
+        :param cosine_scores: one row per text, see `self._select_labels()`.
+        :return: the same results as `self._select_labels()` on each row.
+        """
+
+        n_texts: int = len(cosine_scores)
+        # The scores are compared as `select_themes()` does, in *float64*.
+        negative_scores: np.ndarray = (-cosine_scores).astype(np.float64)
+
+        selected: dict[str, list[list[str]]] = {}
+
+        for label in self._labels:
+            themes: list[str] = list(self._labels[label].keys())
+
+            label_precisions: dict[str, float | str] =\
+                self._precisions.get(label, [])
+
+            label_precision: float =\
+                label_precisions.get('precision', None)
+
+            label_threshold: float =\
+                label_precisions.get('threshold', None)
+
+            utility_row, themes_rows = self._label_rows[label]
+
+            # <Utility Check>
+            is_useful: np.ndarray =\
+                ~(-label_threshold < negative_scores[:, utility_row])
+
+            label_parent: str =\
+                label_precisions.get('parent', None)
+
+            if label_parent != None:
+                is_useful &= np.array([ len(themes_of_text) != 0\
+                                        for themes_of_text in selected.get(
+                                            label_parent, [ [] ] * n_texts) ],
+                                      dtype=bool)
+            # </Utility Check>
+
+            # <Threshold Check>, see `select_themes()`.
+            top_indices: np.ndarray =\
+                np.argsort(-cosine_scores[:, themes_rows], axis=1)[:, :3]
+            top_scores: np.ndarray =\
+                np.sort(negative_scores[:, themes_rows], axis=1)[:, :3]
+
+            is_kept: np.ndarray = ~(-0.10 < top_scores)
+            is_kept[:, 1:] &= ~(np.abs(top_scores[:, 1:] - top_scores[:, :1])\
+                                > label_precision)
+            is_kept &= is_useful[:, np.newaxis]
+            # </Threshold Check>
+
+            selected[label] = [
+                [ themes[i] for i in top_indices[text][is_kept[text]] ]\
+                for text in range(n_texts)
+            ]
+
+        return [
+            { label: json.dumps(selected[label][text])\
+              for label in self._labels }\
+            for text in range(n_texts)
+        ]
+
+    def _embed_labels(self) -> np.ndarray:
+        """
+        :return: the embeddings of `unsupervised_cosine_similarity()` that
+            only depend on the labels, stacked: for each vector of
+            classification, its utility check, then each of its labels.
+
+        With `CLASSIFIER_CATEGORIZER_SAVE_EMBEDDINGS`, they are saved into
+            `<CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY>/<sha256>.npy`, keyed by
+            the model and the labels, and loaded at the next boot.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([ model_name, model.name, self._labels ],
+                                 sort_keys=True).encode())
+        embeddings_file: str =\
+            os.path.join(config.CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY,
+                         digest.hexdigest() + ".npy")
+
+        if config.CLASSIFIER_CATEGORIZER_SAVE_EMBEDDINGS\
+                and os.path.exists(embeddings_file):
+            return np.load(embeddings_file, allow_pickle=False)
+
+        print("Encoding the labels, please wait...")
+
+        # Encoded as `unsupervised_cosine_similarity()` did, so the scores
+        # are the same.
+        embeddings: list[np.ndarray] = []
+        for label in self._labels:
+            enhanced_themes: list[str] = enhance_themes(self._labels[label])
+
+            embeddings.append(model.encode(', '.join(enhanced_themes))\
+                                                        [np.newaxis])
+            embeddings.append(model.encode(enhanced_themes))
+
+        label_embeddings: np.ndarray = np.vstack(embeddings)
+
+        if config.CLASSIFIER_CATEGORIZER_SAVE_EMBEDDINGS:
+            os.makedirs(config.CLASSIFIER_CATEGORIZER_MODEL_DIRECTORY,
+                        exist_ok=True)
+            np.save(embeddings_file + ".tmp.npy", label_embeddings)
+            os.replace(embeddings_file + ".tmp.npy", embeddings_file)
+
+        return label_embeddings
 
 #############################################################################
 
+def enhance_themes(themes_keywords: dict[str, list]) -> list[str]:
+    """
+    :param themes_keywords: see `unsupervised_cosine_similarity()`.
+    :return: each label followed by its keywords, the texts that are encoded.
+    """
+
+    enhanced_themes: list[str] = []
+    for theme, keywords in themes_keywords.items():
+        concatenation: str = '[ ' + theme + ' ] ' +  ' '.join(keywords)
+        enhanced_themes.append(concatenation)
+
+    return enhanced_themes
+
 def unsupervised_cosine_similarity(text: str, themes_keywords: dict[str, list],
-            threshold: float = 0.10, precision: float = 0.08) -> list[str]:
+            threshold: float = 0.10, precision: float = 0.08,
+            utility_check: np.ndarray | None = None,
+            theme_embeddings: np.ndarray | None = None) -> list[str]:
     """
     :param text: a text, it is better if it is already parsed.
         Anyway, it is given to a llm, it could understand sentences.
@@ -143,29 +429,58 @@ def unsupervised_cosine_similarity(text: str, themes_keywords: dict[str, list],
         from `data/labels.json`. see `service()`.
     :param threshold: see `Service()`.
     :param precision: see `Service()`.
+    :param utility_check: the embedding of all the labels joined,
+        encoded here if not given, see `Categorizer._embed_labels()`.
+    :param theme_embeddings: the embedding of each label,
+        encoded here if not given.
 
-    :return: the labels with a good score.
+    :return: the labels with a good score, see `select_themes()`.
     """
 
-    themes: list[str] = list(themes_keywords.keys())
+    model = load_model()
+    enhanced_themes: list[str] = enhance_themes(themes_keywords)
+
+    if utility_check is None:
+        utility_check = model.encode(', '.join(enhanced_themes))
+
+    if theme_embeddings is None:
+        theme_embeddings = model.encode(enhanced_themes)
+
+    # Publication text is a concatenation of the title, the abstract and
+    # sometimes extra metadata.
+    publication_embedding = model.encode(text)
+
+    # Compute similarities.
+    cosine_scores_utility_check: np.ndarray =\
+        util.cos_sim(publication_embedding, utility_check)[0].numpy()
+    cosine_scores: np.ndarray =\
+        util.cos_sim(publication_embedding, theme_embeddings)[0].numpy()
+
+    return select_themes(list(themes_keywords.keys()),
+                         cosine_scores_utility_check, cosine_scores,
+                         threshold=threshold, precision=precision)
+
+def select_themes(themes: list[str], cosine_scores_utility_check: np.ndarray,
+                  cosine_scores: np.ndarray, threshold: float = 0.10,
+                  precision: float = 0.08) -> list[str]:
+    """
+    :param themes: the labels of a vector of classification.
+    :param cosine_scores_utility_check: the cosine similarity between the
+        text and all the labels joined, see `Categorizer._embed_labels()`.
+    :param cosine_scores: the cosine similarity between the text and
+        each label of *themes*.
+    :param threshold: see `Service()`.
+    :param precision: see `Service()`.
+
+    :return: the labels with a good score.
+    """
 
     # <debug>
     print("\n")
     print(f'Possible themes: {themes}')
     # </debug>
 
-    enhanced_themes: list[str] = []
-    for theme, keywords in themes_keywords.items():
-        concatenation: str = '[ ' + theme + ' ] ' +  ' '.join(keywords)
-        enhanced_themes.append(concatenation)
-
     # <Utility Check>
-    utility_check = model.encode(', '.join(enhanced_themes))
-    publication_utility_check = model.encode(text)
-    cosine_scores_utility_check =\
-        util.cos_sim(publication_utility_check, utility_check)[0]
-    indices_utility_check: list[int] =\
-        np.argsort(-cosine_scores_utility_check)[:3].tolist()
     scores_utility_check: list[float] =\
         np.sort(-cosine_scores_utility_check)[:3].tolist()
 
@@ -178,16 +493,6 @@ def unsupervised_cosine_similarity(text: str, themes_keywords: dict[str, list],
         return []
     # </Utility Check>
 
-    theme_embeddings = model.encode(enhanced_themes)
-
-    # Publication text is a concatenation of the title, the abstract and
-    # sometimes extra metadata.
-    publication_text: str = text
-    publication_embedding = model.encode(publication_text)
-
-    # Compute similarities.
-    cosine_scores = util.cos_sim(publication_embedding, theme_embeddings)[0]
-
     # Here, I set up the max number of themes.
     # For something like a "thematique scientifique", let's consider max=3.
     top_indices: list[int] = np.argsort(-cosine_scores)[:3].tolist()
@@ -0,0 +1,229 @@
+"""
+The embedding backends of the *Categorizer*, see
+    `CLASSIFIER_CATEGORIZER_BACKEND`.
+
+From `client/classifier/`, export the model for the "ONNX" backend (it is the
+    only step that needs *Hugging Face*):
+
+    python -m model.categorizer.backends
+
+and compare the backends with:
+
+    python -m benchmarks.categorizer_backends
+"""
+
+import json
+import os
+
+import numpy as np
+
+import config
+
+# <Transformers>
+import torch
+from sentence_transformers import SentenceTransformer
+# </Transformers>
+
+# The *sentence-transformers* model of the *Categorizer*.
+model_name: str = 'all-MiniLM-L6-v2'
+
+backend_names: list[str] = [ "TORCH", "INT8", "ONNX" ]
+
+class TorchBackend:
+    def __init__(self, model_name: str):
+        """
+        The *sentence-transformers* model, in *float32* with *PyTorch*.
+
+        Every backend has the two methods of `SentenceTransformer` used by
+            the *Categorizer*: `encode()` and
+            `get_sentence_embedding_dimension()`.
+        """
+
+        self.name: str = "TORCH"
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, sentences: str | list[str],
+               batch_size: int = 32) -> np.ndarray:
+        return self._model.encode(sentences, batch_size=batch_size)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+
+class Int8Backend(TorchBackend):
+    def __init__(self, model_name: str):
+        """
+        The linear layers of the model are quantized to *int8*
+            (dynamic quantization: the weights are in *int8*, the
+            activations are quantized on the fly), on CPU.
+        """
+
+        super().__init__(model_name)
+
+        self.name = "INT8"
+        self._model = torch.ao.quantization.quantize_dynamic(
+            self._model, { torch.nn.Linear }, dtype=torch.qint8
+        )
+
+class OnnxBackend:
+    def __init__(self, directory: str):
+        """
+        The model exported by `export_onnx()`, run by *ONNX Runtime*, from
+            the files of *directory* only (no *Hugging Face* at boot).
+
+        The pooling of `all-MiniLM-L6-v2` is reproduced: the mean of the
+            token embeddings (without the padding), then the l2 norm.
+        """
+
+        # <ONNX Runtime>, only needed by this backend.
+        import onnxruntime
+        from transformers import AutoTokenizer
+        # </ONNX Runtime>
+
+        self.name: str = "ONNX"
+
+        with open(os.path.join(directory, "backend.json"), 'r') as prf:
+            settings: dict[str, int | bool] = json.load(prf)
+
+        self._max_seq_length: int = settings['max_seq_length']
+        self._dimension: int = settings['dimension']
+        self._normalize: bool = settings['normalize']
+
+        self._tokenizer = AutoTokenizer.from_pretrained(directory)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level =\
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(directory, "model.onnx"), sess_options=options,
+            providers=[ "CPUExecutionProvider" ]
+        )
+        self._input_names: list[str] = [
+            model_input.name for model_input in self._session.get_inputs()
+        ]
+
+    def encode(self, sentences: str | list[str],
+               batch_size: int = 32) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([ sentences ], batch_size=batch_size)[0]
+
+        embeddings: np.ndarray = np.empty((len(sentences), self._dimension),
+                                          dtype=np.float32)
+
+        # Sorted by length, as `SentenceTransformer.encode()` does.
+        order: np.ndarray = np.argsort([ -len(sentence)\
+                                         for sentence in sentences ],
+                                       kind='stable')
+
+        for start in range(0, len(sentences), batch_size):
+            batch: np.ndarray = order[start:start + batch_size]
+
+            inputs: dict[str, np.ndarray] = self._tokenizer(
+                [ sentences[i] for i in batch ], padding=True, truncation=True,
+                max_length=self._max_seq_length, return_tensors='np'
+            )
+
+            token_embeddings: np.ndarray = self._session.run(None, {
+                name: inputs[name].astype(np.int64)\
+                for name in self._input_names
+            })[0]
+
+            # <Mean pooling>
+            mask: np.ndarray =\
+                inputs['attention_mask'][:, :, np.newaxis].astype(np.float32)
+            pooled: np.ndarray = (token_embeddings * mask).sum(axis=1)\
+                / np.clip(mask.sum(axis=1), 1e-9, None)
+            # </Mean pooling>
+
+            if self._normalize:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1,
+                                                 keepdims=True), 1e-12, None)
+
+            embeddings[batch] = pooled
+
+        return embeddings
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+
+def load_backend(backend_name: str, model_name: str):
+    """
+    :param backend_name: "TORCH", "INT8" or "ONNX".
+    :param model_name: the *sentence-transformers* model.
+    :return: the backend, see `TorchBackend`.
+    """
+
+    if backend_name == "TORCH":
+        return TorchBackend(model_name)
+
+    if backend_name == "INT8":
+        return Int8Backend(model_name)
+
+    if backend_name == "ONNX":
+        directory: str = config.CLASSIFIER_CATEGORIZER_ONNX_DIRECTORY
+
+        if not os.path.exists(os.path.join(directory, "model.onnx")):
+            raise Exception(f'There is no ONNX model in {directory}! Run\
+ `python -m model.categorizer.backends` first.')
+
+        return OnnxBackend(directory)
+
+    raise Exception(f'Unknown CLASSIFIER_CATEGORIZER_BACKEND={backend_name},\
+ choose one of {backend_names}.')
+
+def export_onnx(model_name: str, directory: str) -> None:
+    """
+    Export the transformer of *model_name* into `<directory>/model.onnx`,
+        with its tokenizer and the settings of its pooling, for `OnnxBackend`.
+    """
+
+    model = SentenceTransformer(model_name)
+    transformer = model[0]
+
+    if model[1].get_pooling_mode_str() != "mean":
+        raise Exception(f'{model_name} does not use a mean pooling, it can\
+ not be run by OnnxBackend!')
+
+    os.makedirs(directory, exist_ok=True)
+
+    # <Export>, the batch size and the sequence length are dynamic.
+    inputs = model.tokenizer([ "An example.", "Another example, longer." ],
+                             padding=True, return_tensors='pt')
+    input_names: list[str] = [
+        name for name in [ "input_ids", "attention_mask", "token_type_ids" ]\
+        if name in inputs
+    ]
+
+    transformer.auto_model.eval()
+    torch.onnx.export(
+        transformer.auto_model,
+        tuple(inputs[name] for name in input_names),
+        os.path.join(directory, "model.onnx"),
+        input_names=input_names,
+        output_names=[ "last_hidden_state" ],
+        dynamic_axes={
+            name: { 0: "batch", 1: "sequence" }\
+            for name in input_names + [ "last_hidden_state" ]
+        },
+        opset_version=17,
+        dynamo=False,
+    )
+    # </Export>
+
+    model.tokenizer.save_pretrained(directory)
+
+    with open(os.path.join(directory, "backend.json"), 'w') as pwf:
+        json.dump({
+            'model_name': model_name,
+            'max_seq_length': model.get_max_seq_length(),
+            'dimension': model.get_sentence_embedding_dimension(),
+            'normalize': any(type(module).__name__ == "Normalize"\
+                             for module in model),
+        }, fp=pwf, indent=2)
+
+    print(f'{model_name} exported into {directory}.')
+
+#############################################################################
+
+if __name__ == '__main__':
+    export_onnx(model_name, config.CLASSIFIER_CATEGORIZER_ONNX_DIRECTORY)
@@ -0,0 +1,206 @@
+import contextlib
+import fcntl
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+class EmbeddingCache:
+    def __init__(self, directory: str, dimension: int):
+        """
+        An append-only store of the publication embeddings, on disk, keyed by
+            the DOI and a hash of the text (see `self.key()`), so a
+            publication is encoded once, whatever the thresholds are.
+
+        :param directory: one directory per model, see
+            `CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE`.
+        :param dimension: the size of an embedding.
+
+        There are 2 files:
+
+            1. `embeddings.f32`: the embeddings, one after another, in
+                *float32*, memory-mapped (`np.memmap`) to be read.
+            2. `keys.txt`: the key of each row, a row is only visible once
+                its key is written.
+
+        Several processes can share the directory (the service and
+            `model/categorizer/tuning.py`): the files are only written under
+            an exclusive `fcntl.flock()` of `lock`, and the keys appended by
+            the other processes are read before appending (see
+            `self._repair()`).
+        """
+
+        self._dimension: int = dimension
+        self._embeddings_file: str = os.path.join(directory, "embeddings.f32")
+        self._keys_file: str = os.path.join(directory, "keys.txt")
+        self._row_size: int = dimension * np.dtype(np.float32).itemsize
+
+        self._keys: list[str] = [] # the key of each row.
+        self._rows: dict[str, int] = {}
+        self._keys_offset: int = 0 # the bytes of `keys.txt` already read.
+        self._embeddings: np.ndarray = np.empty((0, dimension),
+                                                dtype=np.float32)
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = open(os.path.join(directory, "lock"), 'a')
+
+        with self._locked():
+            self._repair()
+
+    @staticmethod
+    def key(text: str, doi: str = "") -> str:
+        """
+        :return: the key of a publication, its DOI (if any) and the *sha256*
+            of the text, so a modified text is encoded again.
+        """
+        return doi + "\t" + hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, keys: list[str]) -> tuple[np.ndarray, list[int]]:
+        """
+        :return: the embeddings of *keys*, and the indices of the keys that
+            are not in the cache (their rows are left to zero).
+        """
+
+        embeddings: np.ndarray = np.zeros((len(keys), self._dimension),
+                                          dtype=np.float32)
+        missing: list[int] = []
+
+        for i, key in enumerate(keys):
+            row: int | None = self._rows.get(key)
+
+            if row is None:
+                missing.append(i)
+            else:
+                embeddings[i] = self._embeddings[row]
+
+        return embeddings, missing
+
+    def put(self, keys: list[str], embeddings: np.ndarray) -> None:
+        """
+        Append the *embeddings* of *keys*, the ones already known are skipped.
+        """
+
+        with self._locked():
+            self._repair()
+
+            new_rows: dict[str, int] = {}
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in new_rows:
+                    new_rows[key] = i
+
+            if len(new_rows) == 0:
+                return
+
+            # <Append>, the embeddings first, so a key never points to
+            # a row that is not written.
+            with open(self._embeddings_file, 'ab') as pwf:
+                pwf.write(np.ascontiguousarray(
+                    embeddings[list(new_rows.values())], dtype=np.float32
+                ).tobytes())
+
+            keys_content: bytes = ''.join(key + "\n" for key in new_rows)\
+                .encode()
+
+            with open(self._keys_file, 'ab') as pwf:
+                pwf.write(keys_content)
+            # </Append>
+
+            self._register(list(new_rows), len(keys_content))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """
+        The lock of the threads of this process, then the one of the other
+            processes.
+        """
+
+        with self._lock:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _repair(self) -> None:
+        """
+        Under `self._locked()`, register the keys appended by the other
+            processes since the last call, and drop what an interrupted
+            append left: a key without its line feed or without its row, and
+            the rows without key.
+
+        The files are only modified if they are inconsistent, so the rows
+            of the registered keys (memory-mapped by the other processes) are
+            never truncated.
+        """
+
+        # <New keys>, after the last line feed only.
+        content: bytes = b""
+
+        if os.path.exists(self._keys_file):
+            with open(self._keys_file, 'rb') as prf:
+                prf.seek(self._keys_offset)
+                content = prf.read()
+
+        n_bytes: int = content.rfind(b"\n") + 1
+        new_keys: list[str] = content[:n_bytes].decode().split("\n")[:-1]
+        # </New keys>
+
+        n_rows: int = os.path.getsize(self._embeddings_file)\
+            // self._row_size if os.path.exists(self._embeddings_file) else 0
+
+        if n_bytes == len(content) and\
+                len(self._keys) + len(new_keys) <= n_rows:
+            self._register(new_keys, n_bytes)
+
+        else:
+            # <Keys>, rewritten atomically, without the partial key and
+            # the keys without row.
+            keys: list[str] = (self._keys + new_keys)[:n_rows]
+            keys_content: bytes = ''.join(key + "\n" for key in keys).encode()
+
+            with open(self._keys_file + ".tmp", 'wb') as pwf:
+                pwf.write(keys_content)
+            os.replace(self._keys_file + ".tmp", self._keys_file)
+
+            self._keys, self._rows, self._keys_offset = [], {}, 0
+            self._register(keys, len(keys_content))
+            # </Keys>
+
+        # <Rows without key>
+        if os.path.exists(self._embeddings_file) and\
+                os.path.getsize(self._embeddings_file)\
+                != len(self._keys) * self._row_size:
+            with open(self._embeddings_file, 'ab') as pwf:
+                pwf.truncate(len(self._keys) * self._row_size)
+        # </Rows without key>
+
+    def _register(self, keys: list[str], n_bytes: int) -> None:
+        """
+        :param keys: the keys appended to `keys.txt`, in this order.
+        :param n_bytes: their size in `keys.txt`.
+
+        The memory map first, so a reader in another thread never finds
+            a key without its row.
+        """
+
+        n_rows: int = len(self._keys)
+        self._embeddings = self._memmap(n_rows + len(keys))
+
+        for row, key in enumerate(keys, start=n_rows):
+            self._rows[key] = row
+
+        self._keys.extend(keys)
+        self._keys_offset += n_bytes
+
+    def _memmap(self, n_rows: int) -> np.ndarray:
+        if n_rows == 0:
+            return np.empty((0, self._dimension), dtype=np.float32)
+
+        return np.memmap(self._embeddings_file, dtype=np.float32, mode='r',
+                         shape=(n_rows, self._dimension))
@@ -0,0 +1,311 @@
+"""
+Tune the "threshold" and the "precision" of each vector of classification in
+    `data/sentence_transformers_parameters.json`, on a labelled dataset.
+
+From `client/classifier/`, with the same `.env` as the service:
+
+    python -m model.categorizer.tuning [labelled.json ...] [--dry-run]
+
+The labelled files are the ones of `dataset/labelled/` by default, their
+    texts are built from `dataset/processing/` as `ready_to_classify.py` does
+    (or taken from the "text" of each publication, if any).
+
+The publications are encoded once (see `Categorizer.cosine_scores()`, with
+    `CLASSIFIER_CATEGORIZER_EMBEDDING_CACHE=TRUE` they are not encoded again
+    at the next run), then every setting of the grid is evaluated with
+    *numpy* (see `evaluate()`), and the best ones are written back, unless
+    `--dry-run`.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import config
+
+# <Generic Model> + <Retrieve functions from the parsing module>
+dir_path_current: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(dir_path_current.removesuffix("/categorizer") + "/services")
+sys.path.append(
+    dir_path_current.removesuffix("/client/classifier/model/categorizer") +\
+    "/parsing/python/json/")
+
+from JsonParserCrossref import JsonParserCrossref
+# </Generic Model> + </Retrieve functions from the parsing module>
+
+from functions import load_json
+from model.categorizer.app import Categorizer
+
+# <Grid>, 61 thresholds x 141 precisions.
+thresholds_grid: np.ndarray = np.round(np.arange(0.0, 0.605, 0.01), 2)
+precisions_grid: np.ndarray = np.round(np.concatenate([
+    np.arange(0.0, 0.1, 0.001), np.arange(0.1, 0.505, 0.01)
+]), 3)
+# </Grid>
+
+# The *extra class*, see `Classifier.add_extra_class()`.
+extra_class: str = "Other"
+
+# The min score of a label, see `select_themes()`.
+min_score: float = 0.10
+
+def load_corpus(labelled_files: list[str])\
+        -> tuple[list[str], list[str], dict[str, list[list[str]]]]:
+    """
+    :param labelled_files: some files of `dataset/labelled/`.
+    :return: the DOIs, the texts, and the labels of each vector of
+        classification for each text (without the *extra class*).
+    """
+
+    dois: list[str] = []
+    texts: list[str] = []
+    labels: dict[str, list[list[str]]] = {}
+
+    for labelled_file in labelled_files:
+        labelled: dict[str, dict[str, str]] = load_json(labelled_file)
+
+        processing_file: str = os.path.join(
+            os.path.dirname(os.path.dirname(labelled_file)), "processing",
+            os.path.basename(labelled_file)
+        )
+        processing: dict[str, dict[str, str | list[str]]] =\
+            load_json(processing_file)\
+            if os.path.exists(processing_file) else {}
+
+        for doi, publication in labelled.items():
+            # <Text>, as `ready_to_classify.py` and `Classifier.parsing_by_line()`.
+            text: str = publication.get('text', "")
+
+            if text == "" and doi in processing:
+                text = JsonParserCrossref(jsonfile=None)\
+                    .classify_me(line_json=processing[doi])
+
+            if text == "":
+                continue
+            # </Text>
+
+            dois.append(doi)
+            texts.append(text)
+
+            for classification_vector_name, value in publication.items():
+                if classification_vector_name in ('text', 'DOI'):
+                    continue
+
+                labels.setdefault(classification_vector_name, [])\
+                    .append([ label for label in json.loads(value)\
+                              if label != extra_class ])
+
+    return dois, texts, labels
+
+def evaluate(utility_scores: np.ndarray, theme_scores: np.ndarray,
+             gold: np.ndarray, is_allowed: np.ndarray,
+             thresholds: np.ndarray = thresholds_grid,
+             precisions: np.ndarray = precisions_grid) -> np.ndarray:
+    """
+    The rule of `select_themes()` for every (threshold, precision) at once.
+
+    :param utility_scores: the score of the utility check of each text.
+    :param theme_scores: the score of each label for each text.
+    :param gold: `gold[text, label]` is True if the text has this label.
+    :param is_allowed: False for the texts whose parent vector of
+        classification returned nothing (see "parent").
+    :return: `f1[threshold, precision]`, the micro-F1 of each setting.
+
+    A setting only decides which of the 3 top labels of a text are kept:
+
+        1. the threshold keeps or drops the whole text (utility check),
+        2. the precision keeps the 2nd and 3rd labels close to the 1st one.
+
+    So the true positives and the returned labels of every setting are
+        2 matrix products: (thresholds x texts) @ (texts x precisions).
+    The scores are compared in *float64*, negated, as `select_themes()` does.
+    """
+
+    n_texts: int = len(theme_scores)
+    negative_scores: np.ndarray = (-theme_scores).astype(np.float64)
+
+    # <Top 3>
+    top_indices: np.ndarray = np.argsort(-theme_scores, axis=1)[:, :3]
+    top_scores: np.ndarray = np.sort(negative_scores, axis=1)[:, :3]
+    # </Top 3>
+
+    is_true: np.ndarray = gold[np.arange(n_texts)[:, np.newaxis], top_indices]
+
+    # <Threshold Check>, (precisions, texts, 3).
+    is_kept: np.ndarray = ~(-min_score < top_scores)[np.newaxis]\
+        & ~(np.abs(top_scores - top_scores[:, :1])[np.newaxis]\
+            > precisions[:, np.newaxis, np.newaxis])
+
+    n_returned: np.ndarray = is_kept.sum(axis=2).T.astype(np.float64)
+    n_true: np.ndarray = (is_kept & is_true).sum(axis=2).T.astype(np.float64)
+    # </Threshold Check>
+
+    # <Utility Check>, (thresholds, texts).
+    is_useful: np.ndarray = ~(-thresholds[:, np.newaxis]\
+        < -utility_scores.astype(np.float64)[np.newaxis])
+    is_useful &= is_allowed[np.newaxis]
+    # </Utility Check>
+
+    true_positives: np.ndarray = is_useful.astype(np.float64) @ n_true
+    returned: np.ndarray = is_useful.astype(np.float64) @ n_returned
+
+    # <Micro-F1>, 2 * TP / (returned + expected).
+    denominator: np.ndarray = returned + gold.sum()
+
+    return np.divide(2 * true_positives, denominator,
+                     out=np.zeros_like(denominator), where=denominator != 0)
+    # </Micro-F1>
+
+def returns_something(utility_scores: np.ndarray, theme_scores: np.ndarray,
+                      is_allowed: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    :return: for each text, True if `select_themes()` returns a label, for
+        the gating of the children (see "parent").
+
+    The 1st label is kept whatever the precision, so only the threshold
+        matters.
+    """
+
+    return is_allowed\
+        & ~(-threshold < -utility_scores.astype(np.float64))\
+        & ~(-min_score < -theme_scores.max(axis=1).astype(np.float64))
+
+def tune(categorizer: Categorizer, cosine_scores: np.ndarray,
+         labels: dict[str, dict[str, list[str]]],
+         precisions: dict[str, dict[str, float | str]],
+         gold_labels: dict[str, list[list[str]]])\
+            -> dict[str, dict[str, float]]:
+    """
+    :param cosine_scores: see `Categorizer.cosine_scores()`.
+    :param labels: the content of `data/labels.json`.
+    :param precisions: the content of `data/sentence_transformers_parameters.json`.
+    :param gold_labels: see `load_corpus()`.
+    :return: for each vector of classification, the current and the best
+        settings with their micro-F1.
+
+    The parents are tuned before their children, and a child is gated by
+        the best setting of its parent.
+    """
+
+    n_texts: int = len(cosine_scores)
+    is_returning: dict[str, np.ndarray] = {}
+    report: dict[str, dict[str, float]] = {}
+
+    order: list[str] = [ name for name in labels\
+                         if 'parent' not in precisions.get(name, {}) ]\
+        + [ name for name in labels if 'parent' in precisions.get(name, {}) ]
+
+    for classification_vector_name in order:
+        themes: list[str] = list(labels[classification_vector_name].keys())
+        parameters: dict[str, float | str] =\
+            precisions[classification_vector_name]
+
+        # <Gold>
+        gold: np.ndarray = np.zeros((n_texts, len(themes)), dtype=bool)
+        for text, text_labels in\
+                enumerate(gold_labels.get(classification_vector_name, [])):
+            for label in text_labels:
+                if label in themes:
+                    gold[text, themes.index(label)] = True
+        # </Gold>
+
+        is_allowed: np.ndarray = is_returning.get(
+            parameters.get('parent', None), np.ones(n_texts, dtype=bool)
+        )
+
+        utility_scores, theme_scores =\
+            categorizer.label_scores(cosine_scores, classification_vector_name)
+
+        f1: np.ndarray = evaluate(utility_scores, theme_scores, gold,
+                                  is_allowed)
+        current_f1: float = evaluate(
+            utility_scores, theme_scores, gold, is_allowed,
+            thresholds=np.array([ parameters['threshold'] ]),
+            precisions=np.array([ parameters['precision'] ])
+        )[0, 0]
+
+        # <Best>, the closest to the current setting among the ties.
+        best: np.ndarray = np.argwhere(f1 == f1.max())
+        distances: np.ndarray =\
+            np.abs(thresholds_grid[best[:, 0]] - parameters['threshold'])\
+            + np.abs(precisions_grid[best[:, 1]] - parameters['precision'])
+        best_threshold, best_precision = best[np.argmin(distances)]
+        # </Best>
+
+        report[classification_vector_name] = {
+            'threshold': parameters['threshold'],
+            'precision': parameters['precision'],
+            'f1': float(current_f1),
+            'best_threshold': float(thresholds_grid[best_threshold]),
+            'best_precision': float(precisions_grid[best_precision]),
+            'best_f1': float(f1.max()),
+        }
+
+        if current_f1 >= f1.max():
+            report[classification_vector_name]['best_threshold'] =\
+                parameters['threshold']
+            report[classification_vector_name]['best_precision'] =\
+                parameters['precision']
+
+        is_returning[classification_vector_name] = returns_something(
+            utility_scores, theme_scores, is_allowed,
+            report[classification_vector_name]['best_threshold']
+        )
+
+    return { name: report[name] for name in labels }
+
+#############################################################################
+
+if __name__ == '__main__':
+    dry_run: bool = '--dry-run' in sys.argv
+    labelled_files: list[str] = [ arg for arg in sys.argv[1:]\
+                                  if arg != '--dry-run' ]\
+        or sorted(glob.glob('../../dataset/labelled/*.json'))
+
+    labels: dict[str, dict[str, list[str]]] = load_json('data/labels.json')
+    precisions_file: str = 'data/sentence_transformers_parameters.json'
+    precisions: dict[str, dict[str, float | str]] = load_json(precisions_file)
+
+    dois, texts, gold_labels = load_corpus(labelled_files)
+    print(f'{len(texts)} labelled publications from {labelled_files}.')
+
+    # <Encoding>, once.
+    categorizer = Categorizer(labels=labels, precisions=precisions)
+
+    start_time: float = time.perf_counter()
+    cosine_scores: np.ndarray = categorizer.cosine_scores(
+        texts, batch_size=config.CLASSIFIER_CATEGORIZER_BATCH_SIZE, dois=dois
+    )
+    print(f'Encoded in {time.perf_counter() - start_time:.1f}s.')
+    # </Encoding>
+
+    start_time = time.perf_counter()
+    report: dict[str, dict[str, float]] =\
+        tune(categorizer, cosine_scores, labels, precisions, gold_labels)
+    print(f'{len(thresholds_grid) * len(precisions_grid)} settings per vector\
+ of classification evaluated in {time.perf_counter() - start_time:.2f}s.\n')
+
+    print(f'{"":>16} {"threshold":>9} {"precision":>9} {"f1":>6}\
+   {"threshold":>9} {"precision":>9} {"f1":>6}')
+    for classification_vector_name, result in report.items():
+        print(f'{classification_vector_name:>16} {result["threshold"]:>9}\
+ {result["precision"]:>9} {result["f1"]:>6.3f} ->\
+ {result["best_threshold"]:>9} {result["best_precision"]:>9}\
+ {result["best_f1"]:>6.3f}')
+
+    if not dry_run:
+        for classification_vector_name, result in report.items():
+            precisions[classification_vector_name]['threshold'] =\
+                result['best_threshold']
+            precisions[classification_vector_name]['precision'] =\
+                result['best_precision']
+
+        with open(precisions_file, 'w') as pwf:
+            json.dump(precisions, fp=pwf, indent=2)
+            pwf.write("\n")
+
+        print(f'\nWritten into {precisions_file}.')
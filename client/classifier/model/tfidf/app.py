@@ -1,6 +1,14 @@
+import os
+import gc
 import json
+import hashlib
 import re
 import ast
+import copy
+import itertools
+import concurrent.futures
+import multiprocessing
+from collections.abc import Iterator
 from datetime import datetime
 import random
 import numpy as np
@@ -8,7 +16,12 @@ import pandas as pd
 
 import config
 from generic_app import Service
-from functions import load_json, preprocess_text
+from functions import load_json, normalizer, normalize_many
+from model.tfidf.store import TfidfStore
+from model.tfidf.engine import LinearEngine
+from model.tfidf.compact import CompactEngine, models_nbytes, resident_bytes
+from model.tfidf.incremental import HashingTfidfVectorizer, prepare_partial_fit
+from model.tfidf.incremental import partial_fit, binarize
 
 # <Machine Learning>
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
@@ -41,6 +54,9 @@ algorithms: dict[str] = {
         LogisticRegression(solver='lbfgs', class_weight=class_weight),
     "SGDC": SGDClassifier(class_weight=class_weight),
     "SVC": LinearSVC(class_weight=class_weight),
+    # Singlelabel with `CLASSIFIER_TFIDF_INCREMENTAL`, a logistic regression
+    # that supports `partial_fit()`.
+    "SGDC_LOGISTIC": SGDClassifier(loss='log_loss', class_weight=class_weight),
 }
 # </Algorithms>
 
@@ -68,6 +84,16 @@ class Tfidf(Service):
             algorithms[_multilabel_algorithm_name]
 
         self._class_weight: str = class_weight
+        self._multilabel_algorithm_name: str = _multilabel_algorithm_name
+        self._training_workers: int = config.CLASSIFIER_TFIDF_TRAINING_WORKERS
+        self._shared_vectorizer: bool =\
+            config.CLASSIFIER_TFIDF_SHARED_VECTORIZER
+        self._fused_inference: bool =\
+            config.CLASSIFIER_TFIDF_FUSED_INFERENCE
+        self._incremental: bool = config.CLASSIFIER_TFIDF_INCREMENTAL
+        self._compact_model: bool = config.CLASSIFIER_TFIDF_COMPACT_MODEL
+        self._prune_threshold: float = config.CLASSIFIER_TFIDF_PRUNE_THRESHOLD
+        self._hashing_features: int = config.CLASSIFIER_TFIDF_HASHING_FEATURES
         # </Environment variables>
 
         # <Categories for each classification vector>,
@@ -81,7 +107,23 @@ class Tfidf(Service):
         self._classifiers: dict = {}
         # </Classifiers, the ones that will predict>
 
-        self.train(_input_file)
+        # <Scores on the test data>, see `self._validate()`.
+        self._scores: dict[str, dict[str, float]] = {}
+        # </Scores on the test data>
+
+        # <Model artifacts>, see `model/tfidf/store.py`.
+        self._store = TfidfStore(config.CLASSIFIER_TFIDF_MODEL_DIRECTORY)
+        self._model_version: str = ""
+        self._base_version: str = "" # before any `self.update()`.
+        self._save_model: bool = config.CLASSIFIER_TFIDF_SAVE_MODEL
+        # </Model artifacts>
+
+        # <Fused inference engine>, see `model/tfidf/engine.py`.
+        self._engine: LinearEngine | CompactEngine | None = None
+        # </Fused inference engine>
+
+        if not self.load(_input_file):
+            self.train(_input_file)
 
     def prompt(self, prompt: str) -> dict[str, str]:
         """
@@ -91,52 +133,58 @@ class Tfidf(Service):
         """
 
         def func_prompt(prompt):
-            result: dict[str, str] = {}
-
             # <Format text>
-            dataframe: dict[str, list[str | list[str]]] =\
-                preprocess_text(prompt)
-            text_clean: str = ' '.join(dataframe['LEMMATIZATION'][0])
-
-            x: np.ndarray = np.array([text_clean], dtype=object)
+            text_clean: str = normalizer.text_clean(prompt)
             # </Format text>
 
             # <Debug>
             print(f'Lemmatized text: {text_clean}')
             # </Debug>
 
-            for classification_vector_name in self._classes:
-                current_vectorizer =\
-                    self._vectorizers[classification_vector_name]
-                current_classifier =\
-                    self._classifiers[classification_vector_name]
-                current_classes: list[str] =\
-                    self._classes[classification_vector_name]
+            return self._predict([text_clean])[0]
 
-                # <Vectorization>
-                x_vector = current_vectorizer.transform(x)
-                # </Vectorization>
+        return self.generic_prompt(func_prompt, prompt)
 
-                # <Prediction>
-                typelabel: str =\
-                    self._precisions.get(classification_vector_name, {})\
-                        .get("type", "")
+    def prompt_batch(self, prompts: list[str]) -> list[dict[str, str]]:
+        """
+        :param prompts: some texts, see `Classifier.prompt_generic()`.
+        :return: The classification results, in the same order as *prompts*,
+            see `self.prompt()`.
 
+        The whole batch is vectorized into one sparse matrix, and each
+            classifier predicts all the rows at once.
+        """
 
-                current_result: list[str] = []
+        def func_prompt(prompts):
+            # <Format texts>
+            texts_clean: list[str] = normalizer.texts_clean(prompts)
+            # </Format texts>
 
-                if typelabel == "multilabel":
-                    predicted_classes: np.ndarray =\
-                        current_classifier.predict(x_vector)[0]
+            return self._predict(texts_clean)
 
-                    for i in range(len(predicted_classes)):
-                        if predicted_classes[i] != 0:
-                            current_result.append(current_classes[i])
+        return self.generic_prompt(func_prompt, prompts)
 
-                else: # typelabel == "singlelabel"
-                    current_result: list[str] =\
-                        current_classifier.predict(x_vector).tolist()
-                # </Prediction>
+    def _predict(self, texts_clean: list[str]) -> list[dict[str, str]]:
+        """
+        :param texts_clean: the lemmatized texts, see `Normalizer.lemmas()`.
+        :return: the classification result of each text,
+            see `Classifier.prompt_generic()`.
+        """
+
+        results: list[dict[str, str]] = [ {} for _ in texts_clean ]
+
+        x: np.ndarray = np.array(texts_clean, dtype=object)
+
+        # <Prediction>
+        if self._engine is not None:
+            predictions: dict[str, list[list[str]]] = self._engine.predict(x)
+        else:
+            predictions: dict[str, list[list[str]]] = self._predict_labels(x)
+        # </Prediction>
+
+        for classification_vector_name in self._classes:
+            for result, current_result in\
+                zip(results, predictions[classification_vector_name]):
 
                 # <Remove the extra_class when there are more than 1 element>
                 if 2 <= len(current_result) and "Other" in current_result:
@@ -146,9 +194,131 @@ class Tfidf(Service):
                 result[classification_vector_name] =\
                     json.dumps(current_result)
 
-            return result
+        return results
 
-        return self.generic_prompt(func_prompt, prompt)
+    def _predict_labels(self, x: np.ndarray) -> dict[str, list[list[str]]]:
+        """
+        :param x: the lemmatized texts, see `self._predict()`.
+        :return: for each vector of classification, the predicted labels
+            of each text, using `predict()` from *sklearn*.
+            See `LinearEngine.predict()` for the fused version.
+        """
+
+        predictions_labels: dict[str, list[list[str]]] = {}
+
+        # <Vectorization cache>, the texts are transformed only once
+        #                   per vectorizer, see `self._shared_vectorizer`.
+        x_vectors: dict[int] = {}
+        # </Vectorization cache>
+
+        for classification_vector_name in self._classes:
+            current_vectorizer =\
+                self._vectorizers[classification_vector_name]
+            current_classifier =\
+                self._classifiers[classification_vector_name]
+            current_classes: list[str] =\
+                self._classes[classification_vector_name]
+
+            # <Vectorization>
+            if id(current_vectorizer) not in x_vectors:
+                x_vectors[id(current_vectorizer)] =\
+                    current_vectorizer.transform(x)
+
+            x_vector = x_vectors[id(current_vectorizer)]
+            # </Vectorization>
+
+            # <Prediction>
+            typelabel: str =\
+                self._precisions.get(classification_vector_name, {})\
+                    .get("type", "")
+
+            predictions: np.ndarray = current_classifier.predict(x_vector)
+            predictions_labels[classification_vector_name] = []
+
+            for predicted in predictions:
+                current_result: list[str] = []
+
+                if typelabel == "multilabel":
+                    for i in range(len(predicted)):
+                        if predicted[i] != 0:
+                            current_result.append(current_classes[i])
+
+                else: # typelabel == "singlelabel"
+                    current_result.append(predicted.item())
+
+                predictions_labels[classification_vector_name]\
+                    .append(current_result)
+            # </Prediction>
+
+        return predictions_labels
+
+    def _compile_engine(self) -> None:
+        """
+        Build the fused inference engine from the trained models,
+            see `CLASSIFIER_TFIDF_FUSED_INFERENCE` and `model/tfidf/engine.py`.
+
+        With `CLASSIFIER_TFIDF_COMPACT_MODEL`, it is a `CompactEngine`
+            (`model/tfidf/compact.py`), and the *sklearn* vectorizers and
+            classifiers are released once it is built.
+
+        The fused engine is checked once against *sklearn*, on the keywords
+            of the labels (see `LinearEngine.check()`). If they differ, the
+            *sklearn* models keep predicting, the training is not stopped
+            for it.
+        """
+
+        if not (self._fused_inference or self._compact_model):
+            return
+
+        engine = LinearEngine(self._vectorizers, self._classifiers,
+                              self._classes)
+
+        # <Parity with sklearn>, on a sample.
+        sample: np.ndarray = np.array(normalizer.texts_clean([
+            ' '.join(keywords)\
+            for labels in self._labels.values()\
+            for keywords in labels.values()
+        ]), dtype=object)
+
+        try:
+            engine.check(sample, self._classifiers)
+        except Exception as error:
+            print(f'{error} The sklearn models are used instead of the\
+ fused engine.')
+            self._engine = None
+            return
+        # </Parity with sklearn>
+
+        if self._compact_model:
+            del engine # Released with the sklearn models.
+            self._compile_compact_engine()
+            return
+
+        self._engine = engine
+
+        print(f'TFIDF fused engine compiled,\
+ {self._engine.weight_count()} weights.')
+
+    def _compile_compact_engine(self) -> None:
+        nbytes_before: int =\
+            models_nbytes(self._vectorizers, self._classifiers, self._engine)
+        resident_bytes_before: int = resident_bytes()
+
+        self._engine = None
+        self._engine = CompactEngine(self._vectorizers, self._classifiers,
+                                     self._classes, self._prune_threshold)
+
+        # <Release the sklearn models>, already saved if needed.
+        self._vectorizers = {}
+        self._classifiers = {}
+        gc.collect()
+        # </Release the sklearn models>
+
+        print(f'TFIDF compact engine compiled,\
+ {self._engine.weight_count()} weights.\n\
+Models: {nbytes_before} bytes -> {self._engine.nbytes()} bytes.\n\
+Resident memory of the process: {resident_bytes_before} bytes ->\
+ {resident_bytes()} bytes.')
 
     #########################################################################
 
@@ -187,21 +357,477 @@ class Tfidf(Service):
         Repeat the process for each vector of classification.
         """
 
-        dataset = _retrieve_and_format_texts(input_file, self._labels.keys())
         if input_file != "":
             self._input_file = input_file
 
-        for vector_of_classification in self._labels:
-            dataset_current = {
-                vector_of_classification:\
-                    dataset.get(vector_of_classification, {})
-            }
+        dataset = _retrieve_and_format_texts(self._input_file,
+                                             self._labels.keys())
+
+        datasets_current: list[dict[str, str | list[dict]]] = [
+            { vector_of_classification:\
+                dataset.get(vector_of_classification, {}) }\
+            for vector_of_classification in self._labels
+        ]
+
+        # <Shared featurization>, every vector of classification is
+        #                               trained on the same `text_clean`.
+        vectorizer_tfidf, X = None, None
+
+        if self._shared_vectorizer:
+            vectorizer_tfidf, X =\
+                self._fit_shared_vectorizer(datasets_current[0])
+        # </Shared featurization>
+
+        if self._training_workers <= 1:
+            for dataset_current in datasets_current:
+                self._train_a_unique_vector_of_classification(dataset_current,
+                            vectorizer_tfidf=vectorizer_tfidf, X=X)
+
+        else:
+            self._train_in_parallel(datasets_current,
+                                    vectorizer_tfidf=vectorizer_tfidf, X=X)
+
+        self.save()
+        self._compile_engine()
+
+    def _fit_shared_vectorizer(self,
+                        dataset: dict[str, str | list[dict]]) -> tuple:
+        """
+        :param dataset: the dataset of any vector of classification,
+            see `self._train_a_unique_vector_of_classification()`.
+            They all have the same publications in the same order.
+
+        :return: `(vectorizer_tfidf, X)`, the vectorizer fitted once for
+            every vector of classification, and the matrix of the texts.
+        """
+
+        classification_vector_name: str = ''.join(dataset.keys())
+        publications: list[dict[str, str | list[str]]] =\
+            dataset.get(classification_vector_name, [])
+
+        vectorizer_tfidf = self._new_vectorizer()
+
+        X = vectorizer_tfidf.fit_transform(
+            [ publication.get('text_clean', "")\
+             for publication in publications ]
+        )
+
+        return vectorizer_tfidf, X
+
+    def _train_in_parallel(self,
+                datasets_current: list[dict[str, str | list[dict]]],
+                vectorizer_tfidf=None, X=None) -> None:
+        """
+        Train every vector of classification in its own process,
+            see `CLASSIFIER_TFIDF_TRAINING_WORKERS`.
+
+        :param datasets_current: one dataset per vector of classification,
+            see `self._train_a_unique_vector_of_classification()`.
+        :param vectorizer_tfidf: see `self._fit_shared_vectorizer()`.
+        :param X: see `self._fit_shared_vectorizer()`.
+
+        The fitted vectorizers, classifiers and classes are sent back to
+            this process, so the training takes as long as the slowest
+            vector of classification instead of the sum of all of them.
+        """
+
+        # <Copy without the previous models>, it is sent to each process.
+        model_to_train = copy.copy(self)
+        model_to_train._vectorizers = {}
+        model_to_train._classifiers = {}
+        model_to_train._classes = {}
+        model_to_train._scores = {}
+        model_to_train._engine = None
+        # </Copy without the previous models>
+
+        # Under *gevent*, the thread that sends the datasets is a greenlet,
+        # whose write blocks this thread once the pipe is full: a dataset
+        # is only sent once a process is idle, see `normalize_many()`.
+        datasets_to_send: Iterator[dict[str, str | list[dict]]] =\
+            iter(datasets_current)
+
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._training_workers,
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+
+            futures: list[concurrent.futures.Future] = [
+                executor.submit(_train_a_unique_vector_in_process,
+                                model_to_train, dataset_current,
+                                vectorizer_tfidf, X)\
+                for dataset_current in itertools.islice(datasets_to_send,
+                                                        self._training_workers)
+            ]
+            pending: set[concurrent.futures.Future] = set(futures)
+
+            for dataset_current in datasets_to_send:
+                _, pending = concurrent.futures.wait(pending,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+
+                future: concurrent.futures.Future =\
+                    executor.submit(_train_a_unique_vector_in_process,
+                                    model_to_train, dataset_current,
+                                    vectorizer_tfidf, X)
+                futures.append(future)
+                pending.add(future)
+
+            for future in futures:
+                classification_vector_name, vectorizer, classifier, classes,\
+                    scores = future.result()
+
+                # <Keep only one shared vectorizer>, not one copy per process.
+                if vectorizer_tfidf is not None:
+                    vectorizer = vectorizer_tfidf
+                # </Keep only one shared vectorizer>
+
+                self._vectorizers[classification_vector_name] = vectorizer
+                self._classifiers[classification_vector_name] = classifier
+                self._classes[classification_vector_name] = classes
+                self._scores[classification_vector_name] = scores
+
+    def _new_vectorizer(self) -> TfidfVectorizer | HashingTfidfVectorizer:
+        """
+        :return: a vectorizer to fit, a `HashingTfidfVectorizer` with
+            `CLASSIFIER_TFIDF_INCREMENTAL`, a `TfidfVectorizer` otherwise.
+        """
+
+        if self._incremental:
+            return HashingTfidfVectorizer(n_features=self._hashing_features,
+                                          ngram_range=self._ngram_range)
+
+        return TfidfVectorizer(max_features=self._max_features,\
+                               ngram_range=self._ngram_range)
+
+    #########################################################################
+    ## Hot-swap, the serving model is never modified.
+    #########################################################################
+
+    def version(self) -> str:
+        """
+        :return: the version of the models that predict,
+            see `TfidfStore.key()`.
+        """
+        return self._model_version
+
+    def retrained(self, input_file: str = "") -> "Tfidf":
+        """
+        :param input_file: see `self.train()`.
+        :return: a new `Tfidf` model, trained in another process,
+            validated (see `self._validate()`) and only then saved, ready to
+            replace this one.
+
+        This model keeps predicting during the training and is not modified,
+            so the caller publishes the new one with a single reference swap,
+            see `Classifier.retrain_tfidf()`.
+        """
+
+        # <Copy without the models>, it is sent to the process.
+        model_to_train = copy.copy(self)
+        model_to_train._vectorizers = {}
+        model_to_train._classifiers = {}
+        model_to_train._classes = {}
+        model_to_train._scores = {}
+        model_to_train._engine = None
+        # </Copy without the models>
+
+        # Spawned, not forked from the service, which runs under *gevent*.
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1,
+                mp_context=multiprocessing.get_context("spawn")) as executor:
+            vectorizers, classifiers, classes, scores, model_version =\
+                executor.submit(_retrain_in_process, model_to_train,
+                                input_file).result()
+
+        # <New model>
+        model_retrained = copy.copy(model_to_train)
+        model_retrained._vectorizers = vectorizers
+        model_retrained._classifiers = classifiers
+        model_retrained._classes = classes
+        model_retrained._scores = scores
+        model_retrained._model_version = model_version
+        model_retrained._base_version = model_version
+
+        if input_file != "":
+            model_retrained._input_file = input_file
+        # </New model>
+
+        # <Validate, then save>, a rejected model is never loaded at the
+        # next boot. Without engine, as the compact one releases the models.
+        model_retrained._validate(self._scores)
+        model_retrained._save_model = self._save_model
+        model_retrained.save()
+        # </Validate, then save>
+
+        model_retrained._compile_engine()
+
+        return model_retrained
+
+    def updated(self, records: dict[str, dict[str, str]]) -> "Tfidf":
+        """
+        :param records: see `self.update()`.
+        :return: a new `Tfidf` model, updated with *records*, ready to
+            replace this one (which is not modified).
+        """
+
+        model_updated = copy.copy(self)
+
+        # One `deepcopy()` keeps a shared vectorizer shared.
+        model_updated._vectorizers, model_updated._classifiers =\
+            copy.deepcopy((self._vectorizers, self._classifiers))
+
+        model_updated.update(records)
+        return model_updated
+
+    def _validate(self, serving_scores: dict[str, dict[str, float]])\
+                                                                    -> None:
+        """
+        Check a model before it replaces the serving one, it raises an
+            `Exception` otherwise:
+
+        1. every vector of classification has a classifier,
+        2. its Jaccard score (micro) on the test data is at least
+            `CLASSIFIER_TFIDF_RETRAIN_MIN_JACCARD`,
+        3. and at most `CLASSIFIER_TFIDF_RETRAIN_MAX_JACCARD_DROP` below the
+            one of the serving model, if known,
+        4. it predicts a text.
+
+        :param serving_scores: `self._scores` of the serving model, empty
+            if it has been loaded (the scores are not saved).
+        """
+
+        for classification_vector_name in self._labels:
+            if classification_vector_name not in self._classes:
+                raise Exception(f'No TFIDF classifier for\
+ {classification_vector_name}!')
+
+            jaccard: float = self._scores.get(classification_vector_name, {})\
+                .get('jaccard', 0.0)
+
+            if jaccard < config.CLASSIFIER_TFIDF_RETRAIN_MIN_JACCARD:
+                raise Exception(f'The retrained TFIDF model is rejected,\
+ jaccard={jaccard} for {classification_vector_name}!')
+
+            serving_jaccard: float | None =\
+                serving_scores.get(classification_vector_name, {})\
+                    .get('jaccard')
+
+            if serving_jaccard is not None and jaccard < serving_jaccard\
+                    - config.CLASSIFIER_TFIDF_RETRAIN_MAX_JACCARD_DROP:
+                raise Exception(f'The retrained TFIDF model is rejected,\
+ jaccard={jaccard} for {classification_vector_name}, the serving one has\
+ {serving_jaccard}!')
+
+        self._predict([ "" ])
+
+    #########################################################################
+    ## Incremental training.
+    #########################################################################
+
+    def update(self, records: dict[str, dict[str, str]]) -> None:
+        """
+        Fold newly labelled publications into the trained models, without
+            training them again on the whole dataset.
+        It requires `CLASSIFIER_TFIDF_INCREMENTAL`.
 
-            self._train_a_unique_vector_of_classification(dataset_current)
+        :param records: publications in the same format as
+            `CLASSIFIER_TFIDF_INPUT_FILE` (see `dataset/ready_to_classify.py`):
+
+    ```json
+    {
+      "10.3390/su15086429": {
+        "text": "Impact Assessment of Climate Mitigation Finance on ...",
+        "challenges": "[\"Economiques\"]",
+        "themes": "[ \"Other\" ]",
+        ...
+      },
+      ...
+    }
+    ```
+
+        1. The document frequencies of the vectorizers are updated,
+            the feature space does not change (`HashingTfidfVectorizer`).
+        2. Each binary estimator goes on with `SGDClassifier.partial_fit()`.
+        3. The models are saved as a new version, which is loaded at the next
+            boot instead of the one trained on `CLASSIFIER_TFIDF_INPUT_FILE`.
+
+        A category that is not already known by a vector of classification
+            is ignored: for a singlelabel vector, the publications of such
+            a category (or without category, "Other") are not used to update
+            it, and it is not updated if none is left.
+        """
+
+        if not self._incremental:
+            raise Exception('Updating the TFIDF model requires '
+                            'CLASSIFIER_TFIDF_INCREMENTAL=TRUE!')
+
+        if self._compact_model:
+            raise Exception('The TFIDF model can not be updated with '
+                            'CLASSIFIER_TFIDF_COMPACT_MODEL=TRUE!')
+
+        publications: list[dict[str, str]] = list(records.values())
+
+        if len(publications) == 0:
+            return
+
+        # <Format texts>
+        texts_clean: list[str] = normalizer.texts_clean([
+            publication.get('text', "") for publication in publications
+        ])
+        normalizer.lemma_table.save()
+        # </Format texts>
+
+        # <Vectorization>, each vectorizer is updated only once.
+        x_vectors: dict[int] = {}
+
+        for vectorizer in self._vectorizers.values():
+            if id(vectorizer) not in x_vectors:
+                vectorizer.partial_fit(texts_clean)
+                x_vectors[id(vectorizer)] = vectorizer.transform(texts_clean)
+        # </Vectorization>
+
+        for classification_vector_name in self._classes:
+            typelabel: str =\
+                self._precisions.get(classification_vector_name, {})\
+                    .get("type", "")
+            classifier = self._classifiers[classification_vector_name]
+
+            categories: list[list[str]] = [
+                json.loads(publication.get(classification_vector_name, "[]"))\
+                for publication in publications
+            ]
+
+            X = x_vectors[id(self._vectorizers[classification_vector_name])]
+
+            if typelabel == "singlelabel":
+                y = np.array([ str(catego[0]) if len(catego) != 0 else "Other"\
+                              for catego in categories ])
+
+                # <Unknown categories>, `binarize()` would give them a null
+                # row, a negative example for every category.
+                known: np.ndarray = np.isin(y, classifier.classes_)
+
+                if not known.any():
+                    print(f'{classification_vector_name} is not updated,\
+ no publication of a known category.')
+                    continue
+
+                X, y = X[known], y[known]
+                # </Unknown categories>
+
+            else: # typelabel == "multilabel".
+                known_classes: list[str] =\
+                    list(self._classes[classification_vector_name])
+                y = MultiLabelBinarizer(classes=known_classes)\
+                        .fit_transform(categories)
+
+            partial_fit(classifier, X, binarize(classifier, y))
+
+        # <Save as a new version>
+        if self._save_model:
+            key: str = self._store.update_key(self._model_version, records)
+
+            self._store.save(key, self._vectorizers, self._classifiers,
+                             self._classes)
+            self._store.set_latest(self._base_version, key)
+            self._model_version = key
+        # </Save as a new version>
+
+        self._compile_engine()
+
+        print(f'TFIDF model updated with N={len(publications)} publications,\
+ version {self._model_version}.')
+
+    #########################################################################
+    ## Model artifacts.
+    #########################################################################
+
+    def load(self, input_file: str = "") -> bool:
+        """
+        Load the models trained on *input_file* with the current
+            hyperparameters, if they have already been saved.
+
+        :param input_file: see `self.train()`.
+        :return: True if the models have been loaded, False if they need
+            to be trained.
+        """
+
+        if not config.CLASSIFIER_TFIDF_SAVE_MODEL:
+            return False
+
+        if input_file != "":
+            self._input_file = input_file
+
+        base_key: str =\
+            self._store.key(self._input_file, self._hyperparameters())
+        key: str = self._store.latest(base_key)
+
+        if not self._store.exists(key):
+            print(f'No saved TFIDF model for version {key}.')
+            return False
+
+        self._vectorizers, self._classifiers, self._classes =\
+            self._store.load(key)
+        self._base_version = base_key
+        self._model_version = key
+
+        print(f'TFIDF model loaded, version {key}.')
+
+        self._compile_engine()
+        return True
+
+    def save(self) -> None:
+        """
+        Save the trained models, so the next boot with the same input file
+            and hyperparameters only has to call `self.load()`.
+
+        The key is computed once the training is done, because
+            `self.train()` could have been given another input file.
+        It is the version of the models, even if they are not saved.
+        """
+
+        key: str = self._store.key(self._input_file, self._hyperparameters())
+        self._base_version = key
+        self._model_version = key
+
+        if not self._save_model:
+            return
+
+        self._store.save(key, self._vectorizers, self._classifiers,
+                         self._classes)
+        self._store.set_latest(key, key)
+
+        print(f'TFIDF model saved, version {key}.')
+
+    def _hyperparameters(self) -> dict[str, str | int | float | list]:
+        """
+        :return: everything but the input file that changes the trained
+            models, it is a part of the key of the saved models.
+
+        The version of the normalizer is one of them, the vocabulary is made
+            of its lemmas: a model of another version is trained again
+            instead of serving the lemmas of the new one.
+        """
+
+        return {
+            'test_size': self._test_size,
+            'max_features': self._max_features,
+            'ngram_range': list(self._ngram_range),
+            'multilabel_algorithm': self._multilabel_algorithm_name,
+            'class_weight': self._class_weight,
+            'shared_vectorizer': self._shared_vectorizer,
+            'incremental': self._incremental,
+            'hashing_features': self._hashing_features,
+            'labels': sorted(self._labels.keys()),
+            'precisions': self._precisions,
+            'normalizer': normalizer.version(),
+        }
 
     def _train_a_unique_vector_of_classification(self,
-                          dataset: dict[str, str | list[dict]]) -> None:
+                          dataset: dict[str, str | list[dict]],
+                          vectorizer_tfidf=None, X=None) -> None:
         """
+        :param vectorizer_tfidf: an already fitted vectorizer,
+            see `self._fit_shared_vectorizer()`. If None, a vectorizer
+            is fitted for this vector of classification only.
+        :param X: the matrix of the texts given by *vectorizer_tfidf*.
         :param dataset: this one is a json file like this:
 
     ```json
@@ -271,12 +897,12 @@ head(Dataset):\n\
         # </Display>
 
         # <Model Initialization>
-        self._vectorizers[classification_vector_name] =\
-            TfidfVectorizer(max_features=self._max_features,\
-                            ngram_range=self._ngram_range)
+        if vectorizer_tfidf is None:
+            vectorizer_tfidf = self._new_vectorizer()
+
+            X = vectorizer_tfidf.fit_transform(publications_df['text_clean'])
 
-        vectorizer_tfidf = self._vectorizers[classification_vector_name]
-        X = vectorizer_tfidf.fit_transform(publications_df['text_clean'])
+        self._vectorizers[classification_vector_name] = vectorizer_tfidf
         # </Model Initialization>
 
         # <Split into Train and Test data>
@@ -330,6 +956,10 @@ Percentage of training data:\n\
 
         start_time = datetime.now()
         classifier_tfidf.fit(X_train, y_train)
+
+        if self._incremental:
+            prepare_partial_fit(classifier_tfidf,
+                                binarize(classifier_tfidf, y_train))
         end_time = datetime.now()
 
         training_time_tfidf = (end_time - start_time).total_seconds()
@@ -385,6 +1015,12 @@ Percentage of training data:\n\
             jaccard_score(y_train, predicted_train_tfidf, average='micro')
         jaccard_test: float =\
             jaccard_score(y_test, predicted_test_tfidf, average='micro')
+
+        self._scores[classification_vector_name] = {
+            'accuracy': float(accuracy_test_tfidf),
+            'hamming': float(hamming_test),
+            'jaccard': float(jaccard_test),
+        }
         # </Results>
 
         # <Display>
@@ -408,14 +1044,24 @@ Classification Report:\n\
         classes = classifier_tfidf.classes_
         estimators = classifier_tfidf.estimators_
 
-        print("(categories x vocabulary size):", estimators[0].coef_.shape)
+        print("(categories x vocabulary size):",
+              (1, classifier_tfidf.n_features_in_))
         print(80 * "-")
 
+        # <No vocabulary>, the n-grams are hashed.
+        if isinstance(vectorizer_tfidf, HashingTfidfVectorizer):
+            return
+        # </No vocabulary>
+
         NN = 20
         voc = vectorizer_tfidf.vocabulary_
         inv_voc = {v: k for k, v in voc.items()}
 
         for n, (cls, est) in enumerate(zip(classes, estimators)):
+            # A constant predictor has no words.
+            if not hasattr(est, 'coef_'):
+                continue
+
             coef = est.coef_[0]  # shape (1, vocab_size)
             top_words = np.argsort(coef)[-NN:]
 
@@ -531,11 +1177,21 @@ Classification Report:\n\
         `OneVsRestClassifier(self._multilabel_algorithm)` for multilabel.
         `LinearRegression()` for singlelabel.
 
+        With `CLASSIFIER_TFIDF_INCREMENTAL`, it is always a `SGDClassifier`,
+            see `self.update()`.
+
         It stores the classifier into\
                         ``self._classifier[classification_vector_name]``.
         """
 
-        if typelabel == "singlelabel":
+        if self._incremental:
+            algorithm: str = "SGDC_LOGISTIC" if typelabel == "singlelabel"\
+                                             else "SGDC"
+
+            self._classifiers[classification_vector_name] =\
+                OneVsRestClassifier(algorithms[algorithm])
+
+        elif typelabel == "singlelabel":
             self._classifiers[classification_vector_name] =\
                 OneVsRestClassifier(algorithms['LOGISTIC'])
 
@@ -618,6 +1274,66 @@ Classification Report:\n\
 
     #########################################################################
 
+#############################################################################
+## Parallel training.
+#############################################################################
+
+def _train_a_unique_vector_in_process(model: Tfidf,
+                        dataset: dict[str, str | list[dict]],
+                        vectorizer_tfidf=None, X=None) -> tuple:
+    """
+    Run in a process of `Tfidf._train_in_parallel()`.
+
+    :param model: a copy of the `Tfidf` model to train.
+    :param dataset: see `Tfidf._train_a_unique_vector_of_classification()`.
+    :param vectorizer_tfidf: see `Tfidf._fit_shared_vectorizer()`.
+    :param X: see `Tfidf._fit_shared_vectorizer()`.
+
+    :return: `(classification_vector_name, vectorizer, classifier, classes,
+        scores)`.
+    """
+
+    classification_vector_name: str = ''.join(dataset.keys())
+    model._train_a_unique_vector_of_classification(dataset,
+                            vectorizer_tfidf=vectorizer_tfidf, X=X)
+
+    return (
+        classification_vector_name,
+        model._vectorizers[classification_vector_name],
+        model._classifiers[classification_vector_name],
+        model._classes[classification_vector_name],
+        model._scores[classification_vector_name],
+    )
+
+def _retrain_in_process(model: Tfidf, input_file: str) -> tuple:
+    """
+    Run in the process of `Tfidf.retrained()`.
+
+    :param model: a copy of the serving `Tfidf` model, without its models.
+    :param input_file: see `Tfidf.train()`.
+
+    :return: `(vectorizers, classifiers, classes, scores, model_version)`.
+    """
+
+    # <No engine>, it is compiled by `Tfidf.retrained()` in the serving
+    # process, and the compact one releases the models to send back.
+    model._fused_inference = False
+    model._compact_model = False
+    # </No engine>
+
+    # Saved by `Tfidf.retrained()`, once validated.
+    model._save_model = False
+
+    model.train(input_file=input_file)
+
+    return (
+        model._vectorizers,
+        model._classifiers,
+        model._classes,
+        model._scores,
+        model._model_version,
+    )
+
 #############################################################################
 ## Text formating.
 #############################################################################
@@ -626,7 +1342,13 @@ def _retrieve_and_format_texts(input_file: str, labels: list[str])\
                             -> dict[str, dict[str, str | list[dict]]]:
     """
     Merely format the texts of the dataset.
-    It saves it into the file once done.
+    With `CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN`, the formatted texts are saved
+        into a cache next to the input file (`<input_file>.text_clean.json`),
+        keyed by a hash of the text, so only the new or modified texts are
+        formatted again. The cache is thrown away when it has been written
+        by another version of the normalizer (see `Normalizer.version()`).
+    A `text_clean` written into the input file itself (the old way to save
+        them) has no version, it is ignored.
 
     Example:
     'text': "Enhancement in Hybrid Vehicular Networks Using IA ..."
@@ -648,27 +1370,68 @@ def _retrieve_and_format_texts(input_file: str, labels: list[str])\
     print("Formatting the texts, please wait...")
     # </Display>
 
-    is_there_modif: bool = False
+    # <Retrieve the text_clean>, from the cache next to the input file.
+    cache_file: str = input_file + ".text_clean.json"
+    cache_content: dict[str, str | dict[str, str]] = load_json(cache_file)\
+        if config.CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN\
+            and os.path.exists(cache_file) else {}
+
+    cache: dict[str, str] = cache_content.get('texts', {})\
+        if cache_content.get('version') == normalizer.version() else {}
+
+    if len(cache_content) != 0 and len(cache) == 0:
+        print(f'{cache_file} was written by another version of the\
+ normalizer, the texts are formatted again.')
+
+    n_inline: int = 0
+    texts_to_format: list[str] = []
     for publication in dataset.values():
-        if not 'text_clean' in publication:
-            is_there_modif = True
-            text: str = publication.get('text', "")
+        # Of an unknown version of the normalizer.
+        if publication.pop('text_clean', None) is not None:
+            n_inline += 1
+
+        text: str = publication.get('text', "")
+        text_hash: str = _hash_text(text)
 
-            dataframe: dict[str, list[str | list[str]]] =\
-                preprocess_text(text)
-            text_clean: str = ' '.join(dataframe['LEMMATIZATION'][0])
+        if text_hash in cache:
+            publication['text_clean'] = cache[text_hash]
+        else:
+            texts_to_format.append(text)
 
-            publication['text_clean'] = text_clean
+    if n_inline != 0:
+        print(f'N={n_inline} text_clean of {input_file} are ignored, they are\
+ taken from {cache_file} or formatted again.')
+    # </Retrieve the text_clean>
 
-    # <Save the text_clean>
-    if config.CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN and is_there_modif:
-        output_file: str = input_file
-        pwf = open(output_file, 'w')
+    # <Format the new texts>
+    texts_to_format = list(dict.fromkeys(texts_to_format))
+    new_texts_clean: dict[str, str] = {}
 
-        json.dump(dataset, fp=pwf,
-                  separators=(",", ":\n"), indent=2)
+    if len(texts_to_format) != 0:
+        print(f'N={len(texts_to_format)} texts to format.')
 
+        for text, text_clean in\
+                zip(texts_to_format, _format_texts(texts_to_format)):
+            new_texts_clean[_hash_text(text)] = text_clean
+
+        for publication in dataset.values():
+            if 'text_clean' not in publication:
+                publication['text_clean'] =\
+                    new_texts_clean[_hash_text(publication.get('text', ""))]
+
+        # The new words, for the prompts and the next trainings.
+        normalizer.lemma_table.save()
+    # </Format the new texts>
+
+    # <Save the text_clean>, the input file is never rewritten.
+    if config.CLASSIFIER_TFIDF_SAVE_TEXT_CLEAN and len(new_texts_clean) != 0:
+        cache.update(new_texts_clean)
+
+        pwf = open(cache_file + ".tmp", 'w')
+        json.dump({ 'version': normalizer.version(), 'texts': cache }, fp=pwf)
         pwf.close()
+
+        os.replace(cache_file + ".tmp", cache_file)
     # </Save the text_clean>
 
     # <Display>
@@ -707,7 +1470,8 @@ def _retrieve_and_format_texts(input_file: str, labels: list[str])\
                 publication.get(label_name, [])
 
             line_output_file: dict[str, str | list[str]] =\
-                { 'categories': categories, 'text': text, 'text_clean': text }
+                { 'categories': categories, 'text': text,
+                  'text_clean': text_clean }
 
             resultJsonDict[label_name].append(line_output_file)
     # </Sort by categories>
@@ -716,3 +1480,23 @@ def _retrieve_and_format_texts(input_file: str, labels: list[str])\
 
 #############################################################################
 
+def _format_texts(texts: list[str]) -> list[str]:
+    """
+    :param texts: raw texts, see `Normalizer.text_clean()`.
+    :return: their lemmatized texts, in the same order.
+
+    The texts are split into chunks of `CLASSIFIER_TFIDF_FORMATTING_CHUNK_SIZE`
+        formatted by `CLASSIFIER_TFIDF_FORMATTING_WORKERS` processes,
+        see `normalize_many()`.
+    """
+
+    return list(normalize_many(
+        texts,
+        chunksize=config.CLASSIFIER_TFIDF_FORMATTING_CHUNK_SIZE,
+        workers=config.CLASSIFIER_TFIDF_FORMATTING_WORKERS,
+    ))
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+#############################################################################
@@ -0,0 +1,229 @@
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+# <Machine Learning>
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+# </Machine Learning>
+
+from model.tfidf.engine import LinearEngine
+from model.tfidf.store import dump_classifier
+
+class CompactVocabulary:
+    def __init__(self, vectorizer: TfidfVectorizer, kept: np.ndarray):
+        """
+        The vocabulary of a fitted `TfidfVectorizer`, without its dictionary.
+
+        :param vectorizer: a fitted `TfidfVectorizer`.
+        :param kept: the (sorted) feature indices that have a weight,
+            see `CompactEngine`.
+
+        The n-grams are held in one sorted array of *utf-8* bytes, looked up
+            with `np.searchsorted()`, and the idf in *float32*.
+        Every n-gram is kept, because the l2 norm of a text depends on all its
+            n-grams, even the ones whose weight is pruned.
+
+        `self.transform()` returns the columns *kept* only, in *float32*.
+        """
+
+        self._analyzer = clone(vectorizer).build_analyzer()
+
+        terms: list[bytes] = [ b"" ] * len(vectorizer.vocabulary_)
+        for term, index in vectorizer.vocabulary_.items():
+            terms[index] = term.encode()
+
+        terms_array: np.ndarray = np.array(terms, dtype=bytes)
+        order: np.ndarray = np.argsort(terms_array, kind='stable')
+
+        self._terms: np.ndarray = terms_array[order]
+        self._width: int = self._terms.dtype.itemsize
+        self._idf: np.ndarray = vectorizer.idf_[order].astype(np.float32)
+
+        # <Column of each sorted n-gram>, -1 when its weight is pruned.
+        self._columns: np.ndarray = np.full(len(order), -1, dtype=np.int32)
+        position_of_index: np.ndarray = np.empty_like(order)
+        position_of_index[order] = np.arange(len(order))
+        self._columns[position_of_index[kept]] =\
+            np.arange(len(kept), dtype=np.int32)
+        self._n_columns: int = len(kept)
+        # </Column of each sorted n-gram>
+
+    def transform(self, texts) -> sp.csr_matrix:
+        """
+        :return: the same matrix as `TfidfVectorizer.transform()`,
+            restricted to the kept columns.
+        """
+
+        indptr: list[int] = [ 0 ]
+        positions: list[np.ndarray] = []
+
+        for text in texts:
+            terms: list[bytes] = [
+                term.encode() for term in self._analyzer(text)
+            ]
+            # Longer than every n-gram of the vocabulary, it would be
+            # truncated by the cast below.
+            terms = [ term for term in terms if len(term) <= self._width ]
+
+            found: np.ndarray = np.empty(0, dtype=np.intp)
+
+            if len(terms) != 0:
+                terms_array: np.ndarray =\
+                    np.array(terms, dtype=self._terms.dtype)
+                found = np.minimum(np.searchsorted(self._terms, terms_array),
+                                   len(self._terms) - 1)
+                found = found[self._terms[found] == terms_array]
+
+            positions.append(found)
+            indptr.append(indptr[-1] + len(found))
+
+        # <TFIDF>, the counts times the idf, then the l2 norm.
+        all_positions: np.ndarray = np.concatenate(positions)\
+            if len(positions) != 0 else np.empty(0, dtype=np.intp)
+
+        counts = sp.csr_matrix(
+            (np.ones(len(all_positions)), all_positions, np.array(indptr)),
+            shape=(len(indptr) - 1, len(self._terms))
+        )
+        counts.sum_duplicates()
+
+        counts.data *= self._idf[counts.indices]
+        x_tfidf = normalize(counts, norm='l2', copy=False)
+        # </TFIDF>
+
+        # <Kept columns>
+        columns: np.ndarray = self._columns[x_tfidf.indices]
+        is_kept: np.ndarray = columns != -1
+
+        row_of_value: np.ndarray =\
+            np.repeat(np.arange(x_tfidf.shape[0]), np.diff(x_tfidf.indptr))
+        # </Kept columns>
+
+        return sp.csr_matrix(
+            (x_tfidf.data[is_kept].astype(np.float32),
+             (row_of_value[is_kept], columns[is_kept])),
+            shape=(x_tfidf.shape[0], self._n_columns)
+        )
+
+    def nbytes(self) -> int:
+        return self._terms.nbytes + self._idf.nbytes + self._columns.nbytes
+
+class _PrunedVectorizer:
+    def __init__(self, vectorizer, kept: np.ndarray):
+        """
+        A vectorizer without vocabulary (`HashingTfidfVectorizer`),
+            whose `transform()` returns the columns *kept* only, in *float32*.
+        """
+
+        self._vectorizer = vectorizer
+        self._kept: np.ndarray = kept.astype(np.int32)
+
+    def transform(self, texts) -> sp.csr_matrix:
+        return self._vectorizer.transform(texts)[:, self._kept]\
+                   .astype(np.float32)
+
+    def nbytes(self) -> int:
+        return self._kept.nbytes + self._vectorizer.document_frequencies_.nbytes
+
+class CompactEngine(LinearEngine):
+    def __init__(self, vectorizers: dict, classifiers: dict,
+                 classes: dict[str, list[str]], prune_threshold: float):
+        """
+        The fused inference engine of `LinearEngine`, in less memory,
+            see `CLASSIFIER_TFIDF_COMPACT_MODEL`.
+
+        :param prune_threshold: a feature whose absolute weight is at most
+            this one in every column is removed from the weight matrix,
+            see `CLASSIFIER_TFIDF_PRUNE_THRESHOLD`.
+
+        1. The weights are in *float32* instead of *float64*.
+        2. The features that weigh (almost) nothing are pruned.
+        3. The vocabulary is a sorted array (`CompactVocabulary`)
+            instead of a dictionary of n-grams.
+
+        Once it is built, the vectorizers and the classifiers are not needed
+            to predict anymore.
+        """
+
+        super().__init__(vectorizers, classifiers, classes)
+
+        for group in self._groups:
+            weights: np.ndarray = group['weights']
+
+            kept: np.ndarray = np.flatnonzero(
+                np.abs(weights).max(axis=1, initial=0.0) > prune_threshold
+            )
+
+            if isinstance(group['vectorizer'], TfidfVectorizer):
+                group['vectorizer'] =\
+                    CompactVocabulary(group['vectorizer'], kept)
+            else:
+                group['vectorizer'] =\
+                    _PrunedVectorizer(group['vectorizer'], kept)
+
+            group['weights'] =\
+                np.ascontiguousarray(weights[kept], dtype=np.float32)
+            group['intercept'] = group['intercept'].astype(np.float32)
+
+    def nbytes(self) -> int:
+        """
+        :return: the bytes of the arrays used to predict.
+        """
+
+        return sum(
+            group['weights'].nbytes + group['intercept'].nbytes\
+            + group['vectorizer'].nbytes()\
+            for group in self._groups
+        )
+
+#############################################################################
+## Memory report.
+#############################################################################
+
+def models_nbytes(vectorizers: dict, classifiers: dict,
+                  engine: LinearEngine | None = None) -> int:
+    """
+    :return: an estimation of the bytes held by the *sklearn* models
+        (vocabularies, idf, coefficients) and by the fused *engine*,
+        to compare with `CompactEngine.nbytes()`.
+    """
+
+    nbytes: int = 0
+
+    for vectorizer in { id(vectorizer): vectorizer\
+                        for vectorizer in vectorizers.values() }.values():
+        vocabulary: dict[str, int] = getattr(vectorizer, 'vocabulary_', {})
+
+        nbytes += sys.getsizeof(vocabulary)
+        nbytes += sum(sys.getsizeof(term) + sys.getsizeof(index)\
+                      for term, index in vocabulary.items())
+        nbytes += vectorizer.idf_.nbytes
+
+    for classifier in classifiers.values():
+        arrays: dict[str, np.ndarray] = dump_classifier(classifier)
+        nbytes += arrays['coef'].nbytes + arrays['intercept'].nbytes
+
+    if engine is not None:
+        nbytes += sum(group['weights'].nbytes + group['intercept'].nbytes\
+                      for group in engine._groups)
+
+    return nbytes
+
+def resident_bytes() -> int:
+    """
+    :return: the resident memory of this process, 0 if unknown
+        (`/proc` is only on *Linux*, as in the container).
+    """
+
+    try:
+        with open("/proc/self/statm", 'r') as prf:
+            return int(prf.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    except (OSError, ValueError, IndexError):
+        return 0
+
+#############################################################################
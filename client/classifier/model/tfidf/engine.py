@@ -0,0 +1,201 @@
+import numpy as np
+import scipy.sparse as sp
+
+from sklearn.base import is_classifier
+
+from model.tfidf.store import dump_classifier
+
+class LinearEngine:
+    def __init__(self, vectorizers: dict, classifiers: dict,
+                 classes: dict[str, list[str]]):
+        """
+        A fused inference engine over the trained TFIDF classifiers.
+
+        :param vectorizers: `Tfidf._vectorizers`.
+        :param classifiers: `Tfidf._classifiers`.
+        :param classes: `Tfidf._classes`.
+
+        Every classifier is a `OneVsRestClassifier` of linear estimators,
+            whose `predict()` loops over its estimators in *python*.
+        Here, the `coef_` and `intercept_` of all the estimators of all the
+            vectors of classification are stacked into one weight matrix
+            per vectorizer (only one with `CLASSIFIER_TFIDF_SHARED_VECTORIZER`),
+            and a label-index map tells which columns belong to which vector.
+
+        A prediction is then one sparse x dense product, followed by
+            a threshold (multilabel) or an argmax (singlelabel) over the
+            columns of each vector. It returns exactly what
+            `OneVsRestClassifier.predict()` returns, see `self.check()`:
+            the threshold of each vector is the one of *sklearn*, see
+            `binary_threshold()`.
+        """
+
+        # <Groups>, one per distinct vectorizer.
+        self._groups: list[dict] = []
+        # </Groups>
+
+        groups_by_vectorizer: dict[int, dict] = {}
+
+        for classification_vector_name, classifier in classifiers.items():
+            vectorizer = vectorizers[classification_vector_name]
+
+            if id(vectorizer) not in groups_by_vectorizer:
+                groups_by_vectorizer[id(vectorizer)] = {
+                    'vectorizer': vectorizer,
+                    'coef': [],
+                    'intercept': [],
+                    'label_index': [],
+                    'n_columns': 0,
+                }
+
+            group: dict = groups_by_vectorizer[id(vectorizer)]
+            arrays: dict[str, np.ndarray] = dump_classifier(classifier)
+
+            start: int = group['n_columns']
+            stop: int = start + arrays['coef'].shape[0]
+
+            group['coef'].append(arrays['coef'])
+            group['intercept'].append(arrays['intercept'])
+            group['n_columns'] = stop
+
+            # <Label-index map>
+            if bool(arrays['label_binarizer_multilabel']):
+                decision: str = "multilabel"
+                labels: np.ndarray =\
+                    np.array(classes[classification_vector_name], dtype=object)
+
+            else:
+                # One estimator when there are only two categories.
+                decision: str = "binary" if stop - start == 1\
+                                         else "multiclass"
+                labels: np.ndarray = np.asarray(classifier.classes_)
+
+            group['label_index'].append({
+                'name': classification_vector_name,
+                'start': start,
+                'stop': stop,
+                'decision': decision,
+                'labels': labels,
+                'threshold': binary_threshold(classifier),
+            })
+            # </Label-index map>
+
+        for group in groups_by_vectorizer.values():
+            self._groups.append({
+                'vectorizer': group['vectorizer'],
+                'weights':\
+                    np.ascontiguousarray(np.vstack(group['coef']).T),
+                'intercept': np.concatenate(group['intercept']),
+                'label_index': group['label_index'],
+            })
+
+    def predict(self, x: np.ndarray) -> dict[str, list[list[str]]]:
+        """
+        :param x: the lemmatized texts, see `Tfidf._predict()`.
+        :return: for each vector of classification, the predicted labels
+            of each text.
+        """
+
+        predictions: dict[str, list[list[str]]] = {}
+
+        for group in self._groups:
+            x_vector = group['vectorizer'].transform(x)
+            scores: np.ndarray = x_vector @ group['weights']
+            scores += group['intercept']
+
+            for vector in group['label_index']:
+                block: np.ndarray = scores[:, vector['start']:vector['stop']]
+                labels: np.ndarray = vector['labels']
+
+                if vector['decision'] == "multilabel":
+                    predictions[vector['name']] = [
+                        labels[np.flatnonzero(row > vector['threshold'])]\
+                            .tolist()\
+                        for row in block
+                    ]
+
+                elif vector['decision'] == "binary":
+                    indices: np.ndarray =\
+                        (block[:, 0] > vector['threshold']).astype(int)
+
+                    predictions[vector['name']] = [
+                        [ label ] for label in labels[indices].tolist()
+                    ]
+
+                else: # "multiclass".
+                    # `OneVsRestClassifier` keeps the last estimator
+                    # in case of a tie, `np.argmax()` the first one.
+                    n_columns: int = block.shape[1]
+                    indices: np.ndarray =\
+                        n_columns - 1 - np.argmax(block[:, ::-1], axis=1)
+
+                    predictions[vector['name']] = [
+                        [ label ] for label in labels[indices].tolist()
+                    ]
+
+        return predictions
+
+    def check(self, x: np.ndarray, classifiers: dict) -> None:
+        """
+        :param x: some lemmatized texts, see `Tfidf._compile_engine()`.
+        :param classifiers: `Tfidf._classifiers`, the ones compiled.
+
+        It raises an Exception if `self.predict()` does not return exactly
+            what `OneVsRestClassifier.predict()` returns on *x*.
+        """
+
+        predictions: dict[str, list[list[str]]] = self.predict(x)
+
+        for group in self._groups:
+            x_vector = group['vectorizer'].transform(x)
+
+            for vector in group['label_index']:
+                expected: np.ndarray =\
+                    classifiers[vector['name']].predict(x_vector)
+
+                if sp.issparse(expected):
+                    expected = expected.toarray()
+
+                if vector['decision'] == "multilabel":
+                    expected_labels: list[list[str]] = [
+                        vector['labels'][np.flatnonzero(row)].tolist()\
+                        for row in expected
+                    ]
+                else:
+                    expected_labels: list[list[str]] =\
+                        [ [ label ] for label in expected.tolist() ]
+
+                n_differences: int = sum(
+                    predicted != expected_label for predicted, expected_label\
+                    in zip(predictions[vector['name']], expected_labels)
+                )
+
+                if n_differences != 0:
+                    raise Exception(f'The fused engine differs from sklearn\
+ for {vector["name"]} on {n_differences}/{len(expected_labels)} texts!')
+
+    def weight_count(self) -> int:
+        """
+        :return: the number of weights, for the debug display.
+        """
+        return sum(group['weights'].size for group in self._groups)
+
+def binary_threshold(classifier) -> float:
+    """
+    :return: the threshold of the decision of *classifier*, a
+        `OneVsRestClassifier`, as `_threshold_for_binary_predict()` in
+        *sklearn*.
+
+    It depends on its first estimator only: 0 for a linear one, but 0.5 for
+        a constant predictor (a category always, or never, present in the
+        training data), and then for all its estimators.
+    """
+
+    estimator = classifier.estimators_[0]
+
+    if hasattr(estimator, 'decision_function') and is_classifier(estimator):
+        return 0.0
+
+    return 0.5
+
+#############################################################################
@@ -0,0 +1,173 @@
+import numpy as np
+import scipy.sparse as sp
+
+# <Machine Learning>
+from sklearn.base import clone
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.utils.class_weight import compute_class_weight
+# </Machine Learning>
+
+class HashingTfidfVectorizer:
+    def __init__(self, n_features: int, ngram_range: tuple):
+        """
+        A *TFIDF* vectorizer whose feature space never changes,
+            for `CLASSIFIER_TFIDF_INCREMENTAL`.
+
+        :param n_features: the number of columns, see
+            `CLASSIFIER_TFIDF_HASHING_FEATURES`.
+        :param ngram_range: see `CLASSIFIER_TFIDF_NGRAM_RANGE`.
+
+        The n-grams are hashed into *n_features* columns
+            (`HashingVectorizer`) instead of being looked up into a fitted
+            vocabulary, so the new publications keep the same columns as the
+            old ones. The idf is computed from the document frequencies,
+            which are updated by `self.partial_fit()` and saved with the
+            model, as `TfidfVectorizer` would compute them on all the
+            publications seen so far.
+        """
+
+        self.n_features: int = n_features
+        self.ngram_range: tuple = tuple(ngram_range)
+
+        self.document_frequencies_: np.ndarray =\
+            np.zeros(n_features, dtype=np.int64)
+        self.n_documents_: int = 0
+
+        self._hashing = HashingVectorizer(n_features=n_features,
+                                          ngram_range=self.ngram_range,
+                                          alternate_sign=False, norm=None)
+        self._tfidf = TfidfTransformer()
+
+    def partial_fit(self, texts) -> "HashingTfidfVectorizer":
+        """
+        :param texts: new lemmatized texts.
+
+        Add the texts to the document frequencies and update the idf.
+        """
+
+        counts = self._hashing.transform(texts)
+
+        self.document_frequencies_ +=\
+            np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents_ += counts.shape[0]
+
+        self._update_idf()
+        return self
+
+    def fit_transform(self, texts):
+        """
+        :return: the matrix of *texts*, once the document frequencies
+            have been computed on *texts* only.
+        """
+
+        texts = list(texts)
+
+        self.document_frequencies_[:] = 0
+        self.n_documents_ = 0
+
+        return self.partial_fit(texts).transform(texts)
+
+    def transform(self, texts) -> sp.csr_matrix:
+        """
+        :return: the l2-normalized *TFIDF* matrix of *texts*.
+        """
+        return self._tfidf.transform(self._hashing.transform(texts))
+
+    def set_document_frequencies(self, document_frequencies: np.ndarray,
+                                 n_documents: int) -> None:
+        """
+        Restore the state saved by `TfidfStore`.
+        """
+
+        self.document_frequencies_ = document_frequencies.astype(np.int64)
+        self.n_documents_ = int(n_documents)
+
+        self._update_idf()
+
+    @property
+    def idf_(self) -> np.ndarray:
+        return self._tfidf.idf_
+
+    def _update_idf(self) -> None:
+        # Same smoothing as `TfidfTransformer(smooth_idf=True)`.
+        self._tfidf.idf_ =\
+            np.log((self.n_documents_ + 1)\
+                   / (self.document_frequencies_ + 1)) + 1
+
+#############################################################################
+## Incremental updates of the classifiers.
+#############################################################################
+
+def prepare_partial_fit(classifier: OneVsRestClassifier, Y) -> None:
+    """
+    Make every binary estimator of *classifier* ready for `partial_fit()`.
+
+    :param classifier: a fitted `OneVsRestClassifier` of `SGDClassifier`.
+    :param Y: the binarized categories it has been fitted on,
+        see `binarize()`.
+
+    1. `partial_fit()` does not support `class_weight="balanced"`, so the
+        balanced weights of the training data are frozen into a dictionary.
+    2. A category that was always (or never) present is predicted by a
+        constant, which can not learn. It is replaced by a linear estimator
+        with a null coefficient, which predicts the same constant.
+    """
+
+    estimators: list = []
+
+    for i, estimator in enumerate(classifier.estimators_):
+        column: np.ndarray = _column(Y, i)
+
+        if not hasattr(estimator, 'coef_'): # `_ConstantPredictor`.
+            constant = estimator.y_[0]
+
+            estimator = clone(classifier.estimator)
+            estimator.coef_ = np.zeros((1, classifier.n_features_in_))
+            estimator.intercept_ = np.array([float(constant)])
+            estimator.classes_ = np.array([0, 1])
+            estimator.n_features_in_ = classifier.n_features_in_
+            estimator.class_weight = None
+
+        elif estimator.class_weight == "balanced":
+            weights: np.ndarray = compute_class_weight(
+                "balanced", classes=np.array([0, 1]), y=column)
+            estimator.class_weight = { 0: weights[0], 1: weights[1] }
+
+        estimators.append(estimator)
+
+    classifier.estimators_ = estimators
+
+def partial_fit(classifier: OneVsRestClassifier, X, Y) -> None:
+    """
+    :param classifier: see `prepare_partial_fit()`.
+    :param X: the matrix of the new publications.
+    :param Y: their binarized categories, see `binarize()`.
+
+    Each binary estimator is updated with its own column of *Y*, as
+        `OneVsRestClassifier.partial_fit()` does, but from the categories
+        already binarized by `Tfidf.update()` and without *joblib* for a
+        few publications.
+    *Y* only holds known categories, `Tfidf.update()` drops the singlelabel
+        publications of an unknown category beforehand.
+    The constant predictors have already been replaced by estimators that
+        support `partial_fit()`, see `prepare_partial_fit()`.
+    """
+
+    for i, estimator in enumerate(classifier.estimators_):
+        estimator.partial_fit(X, _column(Y, i), classes=np.array([0, 1]))
+
+def binarize(classifier: OneVsRestClassifier, y) -> np.ndarray:
+    """
+    :param y: the categories, as given to `classifier.fit()`.
+    :return: one column per binary estimator of *classifier*.
+    """
+
+    Y = classifier.label_binarizer_.transform(y)
+    return Y.toarray() if sp.issparse(Y) else np.asarray(Y)
+
+def _column(Y, i: int) -> np.ndarray:
+    column = Y[:, i]
+    return np.ravel(column.toarray() if sp.issparse(column) else column)
+
+#############################################################################
@@ -0,0 +1,397 @@
+"""
+Headless hyperparameter search for the TFIDF classifiers.
+
+From `client/classifier/`, with the same `.env` as the service:
+
+    python -m model.tfidf.search
+
+Every candidate of `CLASSIFIER_TFIDF_SEARCH_FILE` (`data/tfidf_search.json`)
+    is cross-validated on `CLASSIFIER_TFIDF_INPUT_FILE` for each vector of
+    classification, and a ranked table is written per vector into
+    `CLASSIFIER_TFIDF_SEARCH_DIRECTORY`. Nothing is displayed with
+    *matplotlib*, nothing blocks.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+import concurrent.futures
+
+import numpy as np
+import scipy.sparse as sp
+
+import config
+
+# <Generic Model>
+import sys
+
+dir_path_current: str = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(dir_path_current.removesuffix("/tfidf") + "/services")
+# </Generic Model>
+
+from functions import load_json
+from model.tfidf.app import algorithms, _retrieve_and_format_texts
+
+# <Machine Learning>
+from sklearn.base import clone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.multiclass import OneVsRestClassifier
+from sklearn.metrics import f1_score, hamming_loss, jaccard_score
+# </Machine Learning>
+
+class TfidfSearch:
+    def __init__(self, input_file: str, precisions: dict[str, dict[str, str]],
+                 grid: dict[str, list], output_directory: str,
+                 folds: int = 5, workers: int = 1):
+        """
+        :param input_file: see `CLASSIFIER_TFIDF_INPUT_FILE`.
+        :param precisions: `data/tfidf_parameters.json`.
+        :param grid: the values to try, like this:
+
+    ```json
+    {
+      "max_features": [ 5000, 10000 ],
+      "ngram_range": [ [1, 1], [1, 2] ],
+      "multilabel_algorithm": [ "SVC", "SGDC", "LOGISTIC" ],
+      "class_weight": [ "balanced", null ]
+    }
+    ```
+
+        :param output_directory: where the tables are written,
+            see `CLASSIFIER_TFIDF_SEARCH_DIRECTORY`.
+        :param folds: the number of folds of the cross-validation.
+        :param workers: the number of processes that run the folds of
+            every candidate.
+
+        The singlelabel vectors always use `algorithms['LOGISTIC']`,
+            as `Tfidf` does, so only multilabel tries every algorithm.
+        """
+
+        self._input_file: str = input_file
+        self._precisions: dict[str, dict[str, str]] = precisions
+        self._grid: dict[str, list] = grid
+        self._output_directory: str = output_directory
+        self._folds: int = folds
+        self._workers: int = workers
+
+        # <Feature matrices>, one per featurization setting, shared by every
+        # vector of classification and every candidate.
+        self._matrices: dict[tuple, sp.csr_matrix] = {}
+        self._cache_directory: str = os.path.join(output_directory, "cache")
+        # </Feature matrices>
+
+    def run(self) -> dict[str, list[dict[str, str | float]]]:
+        """
+        :return: for each vector of classification, the candidates ranked
+            by micro F1 (then Hamming loss).
+        """
+
+        labels: list[str] = list(self._precisions.keys())
+        dataset: dict[str, list[dict[str, str]]] =\
+            _retrieve_and_format_texts(self._input_file, labels)
+
+        # Every vector lists the publications in the same order.
+        texts_clean: list[str] = [
+            publication.get('text_clean', "")\
+            for publication in dataset[labels[0]]
+        ]
+
+        for featurization in self._featurizations():
+            self._matrix(featurization, texts_clean)
+
+        # <Targets>, the type and the y of each vector of classification.
+        targets: dict[str, tuple[str, np.ndarray]] = {}
+
+        for classification_vector_name in labels:
+            typelabel: str =\
+                self._precisions[classification_vector_name].get("type", "")
+            categories: list[list[str]] = [
+                json.loads(publication.get('categories', "[]"))\
+                for publication in dataset[classification_vector_name]
+            ]
+
+            targets[classification_vector_name] =\
+                (typelabel, _get_y(categories, typelabel))
+        # </Targets>
+
+        rankings: dict[str, list[dict[str, str | float]]] = {}
+
+        # <Workers>, the matrices and the targets are sent once to each
+        # process (see `_init_worker()`), a fold only sends its indices.
+        executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+        if self._workers <= 1:
+            _init_worker(self._matrices, targets)
+        else:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._workers, initializer=_init_worker,
+                initargs=(self._matrices, targets))
+        # </Workers>
+
+        try:
+            for classification_vector_name in labels:
+                rankings[classification_vector_name] =\
+                    self._search_vector(classification_vector_name,
+                                        targets[classification_vector_name],
+                                        executor)
+
+                self._write(classification_vector_name,
+                            rankings[classification_vector_name])
+
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        return rankings
+
+    def _search_vector(self, classification_vector_name: str,
+                       target: tuple[str, np.ndarray],
+                       executor: concurrent.futures.ProcessPoolExecutor | None)\
+                                            -> list[dict[str, str | float]]:
+        """
+        Cross-validate every candidate, the folds of all the candidates
+            are run in parallel by *executor* (in this process if None).
+
+        :param target: the type and the y of *classification_vector_name*.
+        """
+
+        typelabel, y = target
+
+        print(f'Searching the hyperparameters of {classification_vector_name}\
+ ({typelabel})...')
+
+        splitter = StratifiedKFold(n_splits=self._folds, shuffle=True,
+                                   random_state=42)\
+            if typelabel == "singlelabel"\
+            else KFold(n_splits=self._folds, shuffle=True, random_state=42)
+
+        candidates: list[dict[str, str | int | list]] =\
+            self._candidates(typelabel)
+        n_publications: int = len(y)
+        splits: list[tuple[np.ndarray, np.ndarray]] =\
+            list(splitter.split(np.zeros(n_publications), y))
+
+        tasks: list[tuple] = [
+            (classification_vector_name, candidate, train_index, test_index)\
+            for candidate in candidates\
+            for train_index, test_index in splits
+        ]
+
+        if executor is None:
+            scores: list[dict[str, float]] =\
+                [ _evaluate_fold(*task) for task in tasks ]
+        else:
+            scores: list[dict[str, float]] =\
+                list(executor.map(_evaluate_fold, *zip(*tasks)))
+
+        # <Average the folds>
+        ranking: list[dict[str, str | float]] = []
+
+        for i, candidate in enumerate(candidates):
+            candidate_scores: list[dict[str, float]] =\
+                scores[i * len(splits):(i + 1) * len(splits)]
+
+            ranking.append({
+                **candidate,
+                **{
+                    metric: float(np.mean([ fold_scores[metric]\
+                                            for fold_scores in candidate_scores ]))\
+                    for metric in candidate_scores[0]
+                },
+            })
+        # </Average the folds>
+
+        ranking.sort(key=lambda row: (-row['f1_micro'], row['hamming']))
+        return ranking
+
+    def _featurizations(self) -> list[tuple[int, tuple]]:
+        return [
+            (max_features, tuple(ngram_range))\
+            for max_features, ngram_range in itertools.product(
+                self._grid.get('max_features',
+                               [ config.CLASSIFIER_TFIDF_MAX_FEATURES ]),
+                self._grid.get('ngram_range',
+                               [ config.CLASSIFIER_TFIDF_NGRAM_RANGE ]))
+        ]
+
+    def _candidates(self, typelabel: str) -> list[dict[str, str | int | list]]:
+        algorithm_names: list[str] = [ "LOGISTIC" ]\
+            if typelabel == "singlelabel"\
+            else self._grid.get('multilabel_algorithm',
+                                [ config.CLASSIFIER_TFIDF_MULTILABEL_ALGORITHM ])
+
+        return [
+            {
+                'max_features': max_features,
+                'ngram_range': list(ngram_range),
+                'algorithm': algorithm_name,
+                'class_weight': class_weight,
+            }\
+            for (max_features, ngram_range), algorithm_name, class_weight\
+            in itertools.product(
+                self._featurizations(), algorithm_names,
+                self._grid.get('class_weight',
+                               [ config.CLASSIFIER_TFIDF_CLASS_WEIGHT ]))
+        ]
+
+    def _matrix(self, featurization: tuple[int, tuple],
+                texts_clean: list[str]) -> sp.csr_matrix:
+        """
+        :return: the *TFIDF* matrix of the whole dataset for *featurization*,
+            fitted once as `Tfidf` does before splitting the data.
+
+        It is cached in memory and into `<output_directory>/cache/`, keyed by
+            the texts and the featurization, so a new search with the same
+            dataset does not vectorize it again.
+        """
+
+        if featurization in self._matrices:
+            return self._matrices[featurization]
+
+        max_features, ngram_range = featurization
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([ max_features, list(ngram_range) ]).encode())
+        for text_clean in texts_clean:
+            digest.update(text_clean.encode())
+            digest.update(b"\0")
+
+        cache_file: str =\
+            os.path.join(self._cache_directory, digest.hexdigest() + ".npz")
+
+        if os.path.exists(cache_file):
+            X = sp.load_npz(cache_file)
+        else:
+            vectorizer_tfidf = TfidfVectorizer(max_features=max_features,
+                                               ngram_range=ngram_range)
+            X = vectorizer_tfidf.fit_transform(texts_clean).tocsr()
+
+            os.makedirs(self._cache_directory, exist_ok=True)
+            sp.save_npz(cache_file, X)
+
+        self._matrices[featurization] = X
+        return X
+
+    def _write(self, classification_vector_name: str,
+               ranking: list[dict[str, str | float]]) -> None:
+        """
+        Write the ranked table of *classification_vector_name* into
+            `<output_directory>/<classification_vector_name>.txt`.
+        """
+
+        header: str = f'{"rank":>4} {"max_features":>12} {"ngram":>6}\
+ {"algorithm":>9} {"class_weight":>12} {"f1_micro":>8} {"hamming":>8}\
+ {"jaccard":>8} {"fit_s":>8} {"predict_s":>9}'
+
+        lines: list[str] = [
+            f'{rank:>4} {row["max_features"]:>12}\
+ {str(tuple(row["ngram_range"])):>6} {row["algorithm"]:>9}\
+ {str(row["class_weight"]):>12} {row["f1_micro"]:>8.4f}\
+ {row["hamming"]:>8.4f} {row["jaccard"]:>8.4f} {row["fit_time"]:>8.3f}\
+ {row["predict_time"]:>9.4f}'\
+            for rank, row in enumerate(ranking, start=1)
+        ]
+
+        table: str = '\n'.join([ header ] + lines) + '\n'
+
+        os.makedirs(self._output_directory, exist_ok=True)
+        output_file: str = os.path.join(self._output_directory,
+                                        classification_vector_name + ".txt")
+
+        with open(output_file, 'w') as pwf:
+            pwf.write(table)
+
+        print(f'\n{classification_vector_name}:\n{table}')
+
+#############################################################################
+
+def _featurization(candidate: dict[str, str | int | list]) -> tuple[int, tuple]:
+    return (candidate['max_features'], tuple(candidate['ngram_range']))
+
+def _get_y(categories: list[list[str]], typelabel: str) -> np.ndarray:
+    """
+    The same y as `Tfidf._get_y_wrapper()`.
+    """
+
+    if typelabel == "singlelabel":
+        return np.array([ str(catego[0]) if len(catego) != 0 else "Other"\
+                          for catego in categories ])
+
+    return MultiLabelBinarizer().fit_transform(categories)
+
+# <Worker data>, see `_init_worker()`.
+_worker_matrices: dict[tuple, sp.csr_matrix] = {}
+_worker_targets: dict[str, tuple[str, np.ndarray]] = {}
+# </Worker data>
+
+def _init_worker(matrices: dict[tuple, sp.csr_matrix],
+                 targets: dict[str, tuple[str, np.ndarray]]) -> None:
+    """
+    Keep the feature matrices (see `TfidfSearch._matrix()`) and the targets
+        of every vector of classification in the process, received once
+        instead of with each fold.
+    """
+
+    global _worker_matrices, _worker_targets
+
+    _worker_matrices = matrices
+    _worker_targets = targets
+
+def _evaluate_fold(classification_vector_name: str,
+                   candidate: dict[str, str | int | list],
+                   train_index: np.ndarray, test_index: np.ndarray)\
+                                                        -> dict[str, float]:
+    """
+    Fit the classifier of *candidate* on one fold, as
+        `Tfidf._set_classifier_tfidf()` builds it, and score it.
+
+    Module-level so that `ProcessPoolExecutor` can run it, on the data of
+        `_init_worker()`.
+    """
+
+    X: sp.csr_matrix = _worker_matrices[_featurization(candidate)]
+    typelabel, y = _worker_targets[classification_vector_name]
+
+    classifier = OneVsRestClassifier(
+        clone(algorithms[candidate['algorithm']])\
+            .set_params(class_weight=candidate['class_weight'])
+    )
+
+    start_time: float = time.perf_counter()
+    classifier.fit(X[train_index], y[train_index])
+    fit_time: float = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    predicted = classifier.predict(X[test_index])
+    predict_time: float = time.perf_counter() - start_time
+
+    y_test = y[test_index]
+    average: str = "micro"
+
+    return {
+        'f1_micro': f1_score(y_test, predicted, average=average),
+        'hamming': hamming_loss(y_test, predicted),
+        'jaccard': jaccard_score(y_test, predicted, average=average),
+        'fit_time': fit_time,
+        'predict_time': predict_time,
+    }
+
+#############################################################################
+
+if __name__ == '__main__':
+    # Imported again by its name, so that `ProcessPoolExecutor` can find
+    # `_evaluate_fold()` in the processes (it is not in their `__main__`).
+    from model.tfidf.search import TfidfSearch
+
+    TfidfSearch(
+        input_file=config.CLASSIFIER_TFIDF_INPUT_FILE,
+        precisions=load_json('data/tfidf_parameters.json'),
+        grid=load_json(config.CLASSIFIER_TFIDF_SEARCH_FILE),
+        output_directory=config.CLASSIFIER_TFIDF_SEARCH_DIRECTORY,
+        folds=config.CLASSIFIER_TFIDF_SEARCH_FOLDS,
+        workers=config.CLASSIFIER_TFIDF_SEARCH_WORKERS,
+    ).run()
@@ -0,0 +1,450 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+# <Machine Learning>
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import LabelBinarizer
+from sklearn.multiclass import OneVsRestClassifier, _ConstantPredictor
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.svm import LinearSVC
+# </Machine Learning>
+
+from model.tfidf.incremental import HashingTfidfVectorizer
+
+# <Artifact format>, increment it whenever the layout below changes,
+#                           so older artifacts are ignored instead of misread.
+# Also when the same input file gives other models (4: trained on the
+#                           lemmatized texts instead of the raw ones).
+# 5: the constant predictors are marked, see `dump_classifier()`.
+FORMAT_VERSION: int = 5
+
+estimator_types: dict[str] = {
+    "LogisticRegression": LogisticRegression,
+    "SGDClassifier": SGDClassifier,
+    "LinearSVC": LinearSVC,
+}
+# </Artifact format>
+
+class TfidfStore:
+    def __init__(self, directory: str):
+        """
+        A versioned store of the trained TFIDF models.
+
+        :param directory: where the artifacts are written,
+            see `CLASSIFIER_TFIDF_MODEL_DIRECTORY`.
+
+        Each artifact is a directory named after a key
+            (see `self.key()`), which contains:
+
+        - `manifest.json`: the format version, the classes of each vector of
+            classification and how to rebuild its vectorizer/classifier.
+        - `vectorizer_<i>.npz`: the vocabulary and the idf of a vectorizer,
+            or the document frequencies of a `HashingTfidfVectorizer`.
+            A vectorizer shared by several vectors of classification
+            is stored only once.
+        - `<classification_vector_name>.npz`: the coefficients and
+            the intercepts of the fitted classifier, and what
+            `partial_fit()` needs to go on with `SGDClassifier`.
+
+        *Pickle* is never used (see `model/tfidf/README.md`):
+            only *json* and *numpy* arrays are read back,
+            with `allow_pickle=False`.
+        """
+
+        self._directory: str = directory
+
+    #########################################################################
+
+    def key(self, input_file: str, hyperparameters: dict) -> str:
+        """
+        :param input_file: the labelled dataset, see
+            `CLASSIFIER_TFIDF_INPUT_FILE`.
+        :param hyperparameters: everything that changes the trained models,
+            mostly the `CLASSIFIER_TFIDF_*` environment variables.
+            It must be serializable with `json.dumps()`.
+
+        :return: a *sha256* of the format version, the content of
+            *input_file* and *hyperparameters*.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(str(FORMAT_VERSION).encode())
+
+        with open(input_file, 'rb') as prf:
+            for chunk in iter(lambda: prf.read(1 << 20), b''):
+                digest.update(chunk)
+
+        digest.update(json.dumps(hyperparameters, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    def update_key(self, key: str, records: dict) -> str:
+        """
+        :param key: the version of the models before the update.
+        :param records: see `Tfidf.update()`.
+        :return: the version of the models once updated with *records*.
+        """
+
+        digest = hashlib.sha256()
+        digest.update(key.encode())
+        digest.update(json.dumps(records, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    def latest(self, key: str) -> str:
+        """
+        :param key: a version trained from scratch, see `self.key()`.
+        :return: its latest update (see `Tfidf.update()`), or *key*.
+        """
+
+        path: str = self._artifact_path(key) + ".latest"
+
+        if not os.path.exists(path):
+            return key
+
+        with open(path, 'r') as prf:
+            return prf.read().strip()
+
+    def set_latest(self, key: str, latest_key: str) -> None:
+        """
+        :param key: a version trained from scratch, see `self.key()`.
+        :param latest_key: the version to load instead of *key*.
+        """
+
+        os.makedirs(self._directory, exist_ok=True)
+        path: str = self._artifact_path(key) + ".latest"
+
+        with open(path + ".tmp", 'w') as pwf:
+            pwf.write(latest_key)
+
+        os.replace(path + ".tmp", path)
+
+    def exists(self, key: str) -> bool:
+        """
+        :return: True if a complete artifact is stored for *key*.
+        """
+        return os.path.exists(self._manifest_path(key))
+
+    #########################################################################
+
+    def save(self, key: str, vectorizers: dict, classifiers: dict,
+             classes: dict[str, list[str]]) -> None:
+        """
+        :param key: see `self.key()`.
+        :param vectorizers: `Tfidf._vectorizers`.
+        :param classifiers: `Tfidf._classifiers`.
+        :param classes: `Tfidf._classes`.
+
+        The artifact is written into a temporary directory first, then
+            renamed, so a crash never leaves a half-written artifact.
+        """
+
+        path: str = self._artifact_path(key)
+        path_tmp: str = path + ".tmp"
+
+        shutil.rmtree(path_tmp, ignore_errors=True)
+        os.makedirs(path_tmp)
+
+        manifest: dict[str, int | dict] = {
+            'format_version': FORMAT_VERSION,
+            'vectorizers': {},
+            'vectors': {},
+        }
+
+        # <Vectorizers>, `id()` -> name of the file.
+        vectorizer_names: dict[int, str] = {}
+
+        for vectorizer in vectorizers.values():
+            if id(vectorizer) in vectorizer_names:
+                continue
+
+            vectorizer_name: str = f'vectorizer_{len(vectorizer_names)}'
+            vectorizer_names[id(vectorizer)] = vectorizer_name
+
+            np.savez(os.path.join(path_tmp, vectorizer_name),
+                     **_dump_vectorizer(vectorizer))
+
+            manifest['vectorizers'][vectorizer_name] =\
+                _describe_vectorizer(vectorizer)
+        # </Vectorizers>
+
+        for classification_vector_name in classifiers:
+            vectorizer = vectorizers[classification_vector_name]
+            classifier = classifiers[classification_vector_name]
+
+            np.savez(os.path.join(path_tmp, classification_vector_name),
+                     **dump_classifier(classifier))
+
+            manifest['vectors'][classification_vector_name] = {
+                'classes': [ str(catego) for catego\
+                            in classes[classification_vector_name] ],
+                'vectorizer': vectorizer_names[id(vectorizer)],
+                'estimator':\
+                    type(classifier.estimator).__name__,
+                'estimator_params':\
+                    _json_params(classifier.estimator.get_params()),
+            }
+
+        with open(os.path.join(path_tmp, "manifest.json"), 'w') as pwf:
+            json.dump(manifest, fp=pwf, indent=2)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(path_tmp, path)
+
+    def load(self, key: str) -> tuple[dict, dict, dict[str, list[str]]]:
+        """
+        :param key: see `self.key()`.
+        :return: `(vectorizers, classifiers, classes)`,
+            see `self.save()`.
+        """
+
+        path: str = self._artifact_path(key)
+
+        with open(self._manifest_path(key), 'r') as prf:
+            manifest: dict[str, int | dict] = json.load(prf)
+
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise Exception(f'The artifact located at {path} '
+                            'has an unsupported format version!')
+
+        # <Vectorizers>, a shared vectorizer is loaded only once.
+        loaded_vectorizers: dict[str, TfidfVectorizer] = {
+            vectorizer_name: _rebuild_vectorizer(
+                _load_arrays(os.path.join(path, vectorizer_name + ".npz")),
+                description
+            )
+            for vectorizer_name, description\
+            in manifest['vectorizers'].items()
+        }
+        # </Vectorizers>
+
+        vectorizers: dict = {}
+        classifiers: dict = {}
+        classes: dict[str, list[str]] = {}
+
+        for classification_vector_name, description\
+            in manifest['vectors'].items():
+
+            arrays: dict[str, np.ndarray] = _load_arrays(
+                os.path.join(path, classification_vector_name + ".npz"))
+
+            vectorizers[classification_vector_name] =\
+                loaded_vectorizers[description['vectorizer']]
+            classifiers[classification_vector_name] =\
+                _rebuild_classifier(arrays, description)
+            classes[classification_vector_name] = description['classes']
+
+        return vectorizers, classifiers, classes
+
+    #########################################################################
+
+    def _artifact_path(self, key: str) -> str:
+        return os.path.join(self._directory, key)
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self._artifact_path(key), "manifest.json")
+
+#############################################################################
+## (De)serialization of the fitted sklearn objects.
+#############################################################################
+
+def _load_arrays(file_path: str) -> dict[str, np.ndarray]:
+    with np.load(file_path, allow_pickle=False) as npz:
+        return { name: npz[name] for name in npz.files }
+
+def _describe_vectorizer(vectorizer) -> dict[str, str | int | list]:
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        return {
+            'kind': "hashing",
+            'n_features': vectorizer.n_features,
+            'ngram_range': list(vectorizer.ngram_range),
+        }
+
+    return {
+        'kind': "tfidf",
+        'max_features': vectorizer.max_features,
+        'ngram_range': list(vectorizer.ngram_range),
+    }
+
+def _dump_vectorizer(vectorizer) -> dict[str, np.ndarray]:
+    """
+    :return: the vocabulary, sorted by feature index, and the idf.
+        For a `HashingTfidfVectorizer`, the document frequencies.
+    """
+
+    if isinstance(vectorizer, HashingTfidfVectorizer):
+        return {
+            'document_frequencies': vectorizer.document_frequencies_,
+            'n_documents': np.array(vectorizer.n_documents_),
+        }
+
+    terms: list[str] = [ "" ] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+
+    return {
+        'vocabulary': np.array(terms, dtype=str),
+        'idf': vectorizer.idf_,
+    }
+
+def _rebuild_vectorizer(arrays: dict[str, np.ndarray], description: dict)\
+                                -> TfidfVectorizer | HashingTfidfVectorizer:
+    if description['kind'] == "hashing":
+        vectorizer = HashingTfidfVectorizer(
+            n_features=description['n_features'],
+            ngram_range=tuple(description['ngram_range'])
+        )
+        vectorizer.set_document_frequencies(arrays['document_frequencies'],
+                                            arrays['n_documents'])
+        return vectorizer
+
+    vectorizer = TfidfVectorizer(
+        max_features=description['max_features'],
+        ngram_range=tuple(description['ngram_range'])
+    )
+
+    vectorizer.vocabulary_ = {
+        term: index for index, term in enumerate(arrays['vocabulary'].tolist())
+    }
+    vectorizer.idf_ = arrays['idf']
+
+    return vectorizer
+
+def dump_classifier(classifier: OneVsRestClassifier)\
+                                            -> dict[str, np.ndarray]:
+    """
+    :return: the coefficients and the intercepts of every binary estimator,
+        stacked into matrices, and the classes of the label binarizer.
+
+    When a category is always (or never) present in the training data,
+    *sklearn* stores a constant predictor instead of a linear estimator.
+    Its decision function is the constant, so it is stored as
+    a null coefficient and an intercept equal to that constant, and marked
+    as *constant*: it is rebuilt as a constant predictor, because it changes
+    the threshold of `OneVsRestClassifier.predict()` (see
+    `binary_threshold()` in `model/tfidf/engine.py`).
+
+    For `SGDClassifier`, the number of updates `t_` and the class weights
+    are also stored (`nan` when the class weight is "balanced"),
+    see `model/tfidf/incremental.py`.
+    """
+
+    estimators: list = classifier.estimators_
+    n_features: int = classifier.n_features_in_
+
+    coef: np.ndarray = np.zeros((len(estimators), n_features))
+    intercept: np.ndarray = np.zeros(len(estimators))
+    t: np.ndarray = np.zeros(len(estimators))
+    constant: np.ndarray = np.zeros(len(estimators), dtype=bool)
+    class_weight: np.ndarray = np.full((len(estimators), 2), np.nan)
+
+    for i, estimator in enumerate(estimators):
+        if hasattr(estimator, 'coef_'):
+            coef[i] = estimator.coef_[0]
+            intercept[i] = estimator.intercept_[0]
+            t[i] = getattr(estimator, 't_', 0.0)
+        else: # `_ConstantPredictor`.
+            intercept[i] = estimator.y_[0]
+            constant[i] = True
+
+        estimator_class_weight = getattr(estimator, 'class_weight', "")
+
+        if estimator_class_weight is None:
+            class_weight[i] = [1.0, 1.0]
+        elif isinstance(estimator_class_weight, dict):
+            class_weight[i] = [ estimator_class_weight[0],
+                                estimator_class_weight[1] ]
+
+    label_binarizer = classifier.label_binarizer_
+
+    return {
+        'coef': coef,
+        'intercept': intercept,
+        't': t,
+        'constant': constant,
+        'class_weight': class_weight,
+        'label_binarizer_classes': label_binarizer.classes_,
+        'label_binarizer_multilabel':\
+            np.array(label_binarizer.y_type_ == "multilabel-indicator"),
+    }
+
+def _rebuild_classifier(arrays: dict[str, np.ndarray],
+                        description: dict) -> OneVsRestClassifier:
+    """
+    :return: a `OneVsRestClassifier` whose `predict()` is exactly the same
+        as the one that has been saved.
+    """
+
+    estimator_type = estimator_types[description['estimator']]
+    estimator_params: dict = description['estimator_params']
+
+    coef: np.ndarray = arrays['coef']
+    intercept: np.ndarray = arrays['intercept']
+    label_binarizer_classes: np.ndarray = arrays['label_binarizer_classes']
+
+    classifier = OneVsRestClassifier(estimator_type(**estimator_params))
+
+    # <Label binarizer>, fitted again on its classes only.
+    label_binarizer = LabelBinarizer(sparse_output=True)
+
+    if bool(arrays['label_binarizer_multilabel']):
+        label_binarizer.fit(np.eye(len(label_binarizer_classes), dtype=int))
+    else:
+        label_binarizer.fit(label_binarizer_classes)
+
+    classifier.label_binarizer_ = label_binarizer
+    classifier.classes_ = label_binarizer.classes_
+    # </Label binarizer>
+
+    # <Binary estimators>
+    estimators: list = []
+    for i in range(coef.shape[0]):
+        if arrays['constant'][i]:
+            estimator = _ConstantPredictor()
+            estimator.y_ = np.array([ int(intercept[i]) ])
+            estimator.n_features_in_ = coef.shape[1]
+
+            estimators.append(estimator)
+            continue
+
+        estimator = estimator_type(**estimator_params)
+        estimator.coef_ = coef[i:i + 1]
+        estimator.intercept_ = intercept[i:i + 1]
+        estimator.classes_ = np.array([0, 1])
+        estimator.n_features_in_ = coef.shape[1]
+
+        # <Go on with `partial_fit()`>
+        if arrays['t'][i] > 0:
+            estimator.t_ = float(arrays['t'][i])
+
+        if not np.isnan(arrays['class_weight'][i, 0]):
+            estimator.class_weight = {
+                0: float(arrays['class_weight'][i, 0]),
+                1: float(arrays['class_weight'][i, 1]),
+            }
+        # </Go on with `partial_fit()`>
+
+        estimators.append(estimator)
+
+    classifier.estimators_ = estimators
+    classifier.n_features_in_ = coef.shape[1]
+    # </Binary estimators>
+
+    return classifier
+
+def _json_params(params: dict) -> dict:
+    """
+    :return: *params* without the values that *json* can not store.
+    They are left to their default values when rebuilding the estimator.
+    """
+
+    return {
+        name: value for name, value in params.items()\
+        if isinstance(value, (str, int, float, bool, type(None)))
+    }
+
+#############################################################################
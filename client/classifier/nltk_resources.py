@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+
+import config
+
+# <NLTK resources>, the packages needed by `functions.py`, and where
+#                                       `nltk.download()` puts them.
+resources: dict[str, str] = {
+    'punkt_tab': "tokenizers/punkt_tab.zip",
+    'stopwords': "corpora/stopwords.zip",
+    'wordnet': "corpora/wordnet.zip",
+    'omw-1.4': "corpora/omw-1.4.zip",
+    'averaged_perceptron_tagger_eng': "taggers/averaged_perceptron_tagger_eng.zip",
+}
+
+checksums_file_name: str = "checksums.json"
+# </NLTK resources>
+
+def provision(directory: str) -> None:
+    """
+    Download the *NLTK* resources into *directory*, and write the *sha256*
+        of each one into `<directory>/checksums.json`.
+
+    :param directory: see `NLTK_DIRECTORY`.
+
+    It is the only step that needs the network, run it once before
+        the boot (see `classifier.Dockerfile`):
+
+    ```bash
+    python nltk_resources.py
+    ```
+    """
+
+    import nltk
+
+    for resource in resources:
+        if not nltk.download(resource, download_dir=directory,
+                             raise_on_error=True):
+            raise Exception(f'The NLTK resource {resource} could not be\
+ downloaded!')
+
+    checksums: dict[str, str] = {
+        resource: _sha256(os.path.join(directory, path))\
+        for resource, path in resources.items()
+    }
+
+    with open(os.path.join(directory, checksums_file_name), 'w') as pwf:
+        json.dump(checksums, fp=pwf, indent=2)
+
+    print(f'NLTK resources provisioned into {directory}.')
+
+def check(directory: str) -> None:
+    """
+    Check that the *NLTK* resources are in *directory*, as written by
+        `provision()`, without any network access.
+    It raises an `Exception` that lists the missing or modified resources.
+
+    :param directory: see `NLTK_DIRECTORY`.
+    """
+
+    checksums: dict[str, str] = read_checksums(directory)
+
+    errors: list[str] = []
+
+    for resource, path in resources.items():
+        file_path: str = os.path.join(directory, path)
+
+        if not os.path.exists(file_path):
+            errors.append(f'{resource}: {file_path} is missing')
+        elif checksums.get(resource) != _sha256(file_path):
+            errors.append(f'{resource}: {file_path} does not match its\
+ checksum')
+
+    if len(errors) != 0:
+        raise Exception(f'The NLTK resources in {directory} are not usable!\
+ Run `python nltk_resources.py` with the same NLTK_DIRECTORY.\n'\
+                        + '\n'.join(errors))
+
+def read_checksums(directory: str) -> dict[str, str]:
+    """
+    :return: the *sha256* of each resource, written by `provision()`.
+    """
+
+    checksums_file: str = os.path.join(directory, checksums_file_name)
+
+    if not os.path.exists(checksums_file):
+        raise Exception(f'The NLTK resources are not provisioned in\
+ {directory} (no {checksums_file_name})! Run `python nltk_resources.py`\
+ with the same NLTK_DIRECTORY.')
+
+    with open(checksums_file, 'r') as prf:
+        return json.load(prf)
+
+def _sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(file_path, 'rb') as prf:
+        for block in iter(lambda: prf.read(1 << 20), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+#############################################################################
+
+if __name__ == '__main__':
+    provision(config.NLTK_DIRECTORY)
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+
+import config
+import nltk_resources
+from functions import load_json, normalizer, get_synonyms
+
+# Bump it when the same labels and *WordNet* give another index.
+# 2: the synonyms of each keyword, see `SynonymIndex.synonyms()`.
+FORMAT_VERSION: int = 2
+
+class SynonymIndex:
+    def __init__(self, index: dict[str, str | dict]):
+        """
+        The keywords of `data/labels.json` expanded with their synonyms,
+            as written by `build()`, see `load()`.
+
+        :param index: the content of the artifact, like this:
+
+    ```json
+    {
+      "version": "<sha256>",
+      "keywords": { "challenges": { "Economiques": [ "Budget", ... ] } },
+      "synonyms": { "Budget": [ "budget", ... ] },
+      "reverse": { "budget": [ [ "challenges", "Economiques" ] ] }
+    }
+    ```
+
+        The keys of "reverse" are lemmas, as in the `text_clean` of a text
+            (see `Normalizer.lemmas()`), so a token of a text gives its
+            labels with a single lookup.
+        """
+
+        self.version: str = index['version']
+        self._keywords: dict[str, dict[str, list[str]]] = index['keywords']
+        self._synonyms: dict[str, list[str]] = index['synonyms']
+        self._reverse: dict[str, list[tuple[str, str]]] = {
+            lemma: [ tuple(vector_and_label) for vector_and_label in labels ]\
+            for lemma, labels in index['reverse'].items()
+        }
+
+    def keywords(self, classification_vector_name: str)\
+                                                -> dict[str, set[str]]:
+        """
+        :return: `expand_keywords_with_synonyms()` of the labels of
+            *classification_vector_name*, plus the keywords themselves.
+        """
+
+        return {
+            label: set(keywords)\
+            for label, keywords in\
+                self._keywords[classification_vector_name].items()
+        }
+
+    def synonyms(self, keyword: str) -> set[str] | None:
+        """
+        :return: `get_synonyms()` of *keyword*, None if it is not a keyword
+            of the labels.
+        """
+
+        synonyms: list[str] | None = self._synonyms.get(keyword)
+
+        return set(synonyms) if synonyms is not None else None
+
+    def labels_of(self, lemma: str) -> list[tuple[str, str]]:
+        """
+        :return: the (vector of classification, label) whose keywords or
+            synonyms hold *lemma*, `[]` if none.
+        """
+
+        return self._reverse.get(lemma, [])
+
+def version(labels: dict[str, dict[str, list[str]]]) -> str:
+    """
+    :return: a *sha256* of *labels*, of *WordNet* and of `FORMAT_VERSION`.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps(labels, sort_keys=True).encode())
+    digest.update(nltk_resources.read_checksums(config.NLTK_DIRECTORY)\
+                  .get('wordnet', "").encode())
+    digest.update(str(FORMAT_VERSION).encode())
+
+    return digest.hexdigest()
+
+def build(labels: dict[str, dict[str, list[str]]], directory: str) -> str:
+    """
+    Walk *WordNet* for every keyword of *labels*, once, and write the index
+        into `<directory>/<version>.json`.
+
+    :param labels: the content of `data/labels.json`.
+    :param directory: see `NLTK_SYNONYMS_DIRECTORY`.
+    :return: the path of the artifact.
+    """
+
+    keywords: dict[str, dict[str, list[str]]] = {}
+    synonyms: dict[str, list[str]] = {}
+    reverse: dict[str, list[list[str]]] = {}
+
+    for classification_vector_name, keywords_of_labels in labels.items():
+        keywords[classification_vector_name] = {}
+
+        for label, label_keywords in keywords_of_labels.items():
+            # <Expansion>, as `expand_keywords_with_synonyms()` did,
+            # a keyword shared by several labels is walked once.
+            expanded: set[str] = set(label_keywords)
+
+            for keyword in label_keywords:
+                if keyword not in synonyms:
+                    synonyms[keyword] = sorted(get_synonyms(keyword))
+
+                expanded.update(synonyms[keyword])
+            # </Expansion>
+
+            all_keywords: list[str] = sorted(expanded)
+            keywords[classification_vector_name][label] = all_keywords
+
+            # <Reverse index>, "police_force" => "police", "force".
+            for keyword in all_keywords:
+                for lemma in normalizer.lemmas(keyword.replace('_', ' ')):
+                    labels_of_lemma: list[list[str]] =\
+                        reverse.setdefault(lemma, [])
+
+                    if [ classification_vector_name, label ]\
+                            not in labels_of_lemma:
+                        labels_of_lemma.append(
+                            [ classification_vector_name, label ]
+                        )
+            # </Reverse index>
+
+    index_version: str = version(labels)
+    index_file: str = os.path.join(directory, index_version + ".json")
+
+    os.makedirs(directory, exist_ok=True)
+
+    with open(index_file + ".tmp", 'w') as pwf:
+        json.dump({ 'version': index_version, 'keywords': keywords,
+                    'synonyms': synonyms, 'reverse': reverse }, fp=pwf)
+
+    os.replace(index_file + ".tmp", index_file)
+    normalizer.lemma_table.save()
+
+    print(f'Synonym index written into {index_file}\
+ ({len(reverse)} lemmas).')
+
+    return index_file
+
+def load(labels: dict[str, dict[str, list[str]]],
+         directory: str) -> SynonymIndex:
+    """
+    :return: the index of *labels*, built first if it is not in *directory*
+        (a new `data/labels.json` or *WordNet*).
+    """
+
+    index_file: str = os.path.join(directory, version(labels) + ".json")
+
+    if not os.path.exists(index_file):
+        print(f'No synonym index for these labels in {directory},\
+ building it...')
+        build(labels, directory)
+
+    return SynonymIndex(load_json(index_file))
+
+# <Shared index>, the one of `data/labels.json`, loaded by `index()`.
+_index: SynonymIndex | None = None
+_index_lock = threading.Lock()
+# </Shared index>
+
+def index() -> SynonymIndex:
+    """
+    :return: the index of `data/labels.json`, loaded once per process, on
+        first use (see `load()`).
+    """
+
+    global _index
+
+    with _index_lock:
+        if _index is None:
+            _index = load(load_json('data/labels.json'),
+                          config.NLTK_SYNONYMS_DIRECTORY)
+
+    return _index
+
+def labels_of(lemma: str) -> list[tuple[str, str]]:
+    """
+    :param lemma: a token of a `text_clean`, see `Normalizer.lemmas()`.
+    :return: `SynonymIndex.labels_of()` of the shared index, the
+        (vector of classification, label) of *lemma*.
+    """
+    return index().labels_of(lemma)
+
+#############################################################################
+
+if __name__ == '__main__':
+    build(load_json('data/labels.json'), config.NLTK_SYNONYMS_DIRECTORY)